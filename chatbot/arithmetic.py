@@ -0,0 +1,204 @@
+"""
+Safe Arithmetic Expressions
+A small calculator for the chatbot: + - * / and ^ (or **), parentheses,
+decimals and unary minus, with the usual precedence
+
+Expressions are parsed with the shunting-yard algorithm and evaluated from
+the resulting postfix form, never with eval(). Numbers are floats, and the
+length and exponent limits keep a hostile message from costing much CPU
+in a server shared by many users. Repeated expressions come from an LRU cache.
+"""
+
+import math
+import re
+from functools import lru_cache
+
+MAX_EXPRESSION_LENGTH = 100  # Characters
+MAX_EXPONENT = 64            # Largest allowed |exponent| for ^
+MAX_NESTING = 10             # Signs or parentheses around one number
+CACHE_SIZE = 1024            # Expressions remembered by evaluate()
+
+# Finds expressions inside a message: numbers joined by operators, with
+# optional unary minus and parentheses (the parser checks they balance).
+# Signs and parentheses around a number are capped, so a long run of them
+# can't make a regex search try every start position across the whole run
+NUMBER = r"\d+(?:\.\d+)?|\.\d+"
+OPERAND = rf"(?:[-(]\s*){{0,{MAX_NESTING}}}(?:{NUMBER})(?:\s*\)){{0,{MAX_NESTING}}}"
+EXPRESSION_PATTERN = rf"{OPERAND}(?:\s*(?:\*\*|[-+*/^])\s*{OPERAND})+"
+
+TOKEN_PATTERN = re.compile(rf"\s*(?:({NUMBER})|(\*\*|[-+*/^()]))")
+
+# Binary operators: (precedence, groups right to left)
+BINARY_OPERATORS = {
+    '+': (1, False),
+    '-': (1, False),
+    '*': (2, False),
+    '/': (2, False),
+    '^': (4, True),
+}
+
+# Unary minus binds tighter than * but looser than ^, so -2^2 is -4
+NEGATE = 'neg'
+NEGATE_PRECEDENCE = 3
+
+
+class MathError(ValueError):
+    """Raised for expressions that are invalid or over the limits"""
+
+
+def tokenize_expression(expression):
+    """Split an expression into numbers (as floats) and operator symbols"""
+    tokens = []
+    position = 0
+    expression = expression.rstrip()
+    while position < len(expression):
+        match = TOKEN_PATTERN.match(expression, position)
+        if not match:
+            raise MathError(f"unexpected {expression[position]!r}")
+        number, symbol = match.groups()
+        if number is not None:
+            tokens.append(float(number))
+        else:
+            tokens.append('^' if symbol == '**' else symbol)
+        position = match.end()
+    return tokens
+
+
+def to_postfix(tokens):
+    """
+    Reorder tokens into postfix form with the shunting-yard algorithm
+    e.g. 2 + 3 * 4 -> 2 3 4 * +
+    """
+    output = []
+    operators = []
+    expect_operand = True  # False right after a number or ')'
+
+    for token in tokens:
+        if isinstance(token, float):
+            if not expect_operand:
+                raise MathError("missing operator")
+            output.append(token)
+            expect_operand = False
+        elif token == '(':
+            if not expect_operand:
+                raise MathError("missing operator")
+            operators.append(token)
+        elif token == ')':
+            if expect_operand:
+                raise MathError("missing number")
+            while operators and operators[-1] != '(':
+                output.append(operators.pop())
+            if not operators:
+                raise MathError("unbalanced parentheses")
+            operators.pop()
+        elif expect_operand:
+            # A sign in front of a number
+            if token == '-':
+                operators.append(NEGATE)
+            elif token != '+':
+                raise MathError("missing number")
+        else:
+            precedence, right_to_left = BINARY_OPERATORS[token]
+            while operators and operators[-1] != '(':
+                top = operators[-1]
+                top_precedence = NEGATE_PRECEDENCE if top == NEGATE else BINARY_OPERATORS[top][0]
+                if top_precedence < precedence or (top_precedence == precedence and right_to_left):
+                    break
+                output.append(operators.pop())
+            operators.append(token)
+            expect_operand = True
+
+    if expect_operand:
+        raise MathError("missing number")
+    while operators:
+        top = operators.pop()
+        if top == '(':
+            raise MathError("unbalanced parentheses")
+        output.append(top)
+    return output
+
+
+def evaluate_postfix(postfix):
+    """
+    Compute a postfix expression
+    Raises ZeroDivisionError when dividing by zero and MathError when an
+    exponent is over the limit or the result is not a finite real number
+    """
+    stack = []
+    for token in postfix:
+        if isinstance(token, float):
+            stack.append(token)
+            continue
+        if token == NEGATE:
+            stack.append(-stack.pop())
+            continue
+
+        right = stack.pop()
+        left = stack.pop()
+        if token == '+':
+            value = left + right
+        elif token == '-':
+            value = left - right
+        elif token == '*':
+            value = left * right
+        elif token == '/':
+            value = left / right
+        else:
+            if abs(right) > MAX_EXPONENT:
+                raise MathError(f"exponents are limited to {MAX_EXPONENT}")
+            try:
+                value = left ** right
+            except OverflowError:
+                raise MathError("the result is too large") from None
+            if isinstance(value, complex):
+                raise MathError("there is no real answer")
+        stack.append(value)
+
+    result = stack[0]
+    if math.isinf(result) or math.isnan(result):
+        raise MathError("the result is too large")
+    return result
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _evaluate(expression):
+    return evaluate_postfix(to_postfix(tokenize_expression(expression)))
+
+
+def check_surroundings(text, start, end):
+    """
+    Raise MathError if the expression found at text[start:end] was cut out
+    of a longer one: EXPRESSION_PATTERN takes at most MAX_NESTING signs or
+    parentheses around a number, and stops before an operator with nothing
+    after it or at a character numbers can't hold ('1,000', '1e5', '2..3'),
+    so what it leaves next to the match must not be ignored
+    """
+    # Touching the match: part of the same number or word
+    touching_before = text[start - 1:start] if start else ''
+    touching_after = text[end:end + 2]
+    if touching_before and (touching_before.isalnum() or touching_before in '.,'):
+        raise MathError(f"unexpected {touching_before!r}")
+    # A full stop ending the sentence is fine, one inside a number is not
+    if touching_after[:1].isdigit() or (touching_after[:1] == '.' and touching_after[1:].isdigit()):
+        raise MathError(f"unexpected {touching_after[0]!r}")
+
+    before = text[:start].rstrip()[-1:]
+    after = text[end:].lstrip()[:1]
+    if before in ('(', '-') or after == ')':
+        raise MathError(f"expressions can't nest more than {MAX_NESTING} levels deep")
+    if before in ('*', '/', '^') or (after and after in '+-*/^'):
+        raise MathError("missing number")
+
+
+def evaluate(expression):
+    """
+    Compute an arithmetic expression such as '2 + 3 * (4 - 1.5)'
+    Returns a float; raises MathError (a ValueError) or ZeroDivisionError
+    """
+    if len(expression) > MAX_EXPRESSION_LENGTH:
+        raise MathError(f"expressions are limited to {MAX_EXPRESSION_LENGTH} characters")
+    # Spacing doesn't change the answer, so it shouldn't change the cache key
+    return _evaluate(' '.join(expression.split()))
+
+
+cache_info = _evaluate.cache_info
@@ -0,0 +1,253 @@
+"""
+Chatbot Micro-Benchmark
+Measures the per-message cost of get_response's matching stages
+
+"before" is the original pipeline: a phrase scan for introductions, five
+regexes rebuilt for name extraction, a regex search for math and a nested
+substring loop over every keyword. "after" is the single precompiled scan
+plus the intent index.
+
+Both are measured with the demo rule set and with it grown by synthetic
+intents (--scale), to show how each behaves with a production-sized rule set.
+
+The typo tolerance is measured for accuracy (misspelled keywords that still
+find their intent, and ordinary words wrongly "corrected") and for lookup
+latency, with the demo vocabulary and with --words made-up words. The run
+exits with status 1 if any ordinary word is corrected.
+
+Usage: python benchmark.py [--rounds N] [--scale N] [--words N]
+"""
+
+import random
+import re
+import sys
+import time
+
+from chatbot import RuleBasedChatbot, scan_message
+from fuzzy import TrigramIndex
+from intents import FUZZY_MIN_LENGTH, IntentIndex, tokenize
+
+MESSAGES = [
+    "Hello there!",
+    "hi, how are you doing today?",
+    "My name is Alice",
+    "I'm Bob and I like chess",
+    "what is 12 * 4",
+    "can you tell me a joke",
+    "what time is it right now",
+    "I feel really sad and down today",
+    "the weather looks like rain",
+    "thanks a lot, you are awesome",
+    "I was thinking about dinner, what is your favorite food",
+    "this is a long message that does not match any specific rule at all, just chatting",
+    "goodbye, see you later",
+    "how old are you",
+    "what can you do",
+]
+
+
+# ===== BEFORE: THE ORIGINAL PIPELINE =====
+
+def legacy_extract_name(user_input):
+    patterns = [
+        r"my name is (\w+)",
+        r"i am (\w+)",
+        r"i'm (\w+)",
+        r"call me (\w+)",
+        r"this is (\w+)",
+    ]
+    for pattern in patterns:
+        match = re.search(pattern, user_input.lower())
+        if match:
+            return match.group(1).capitalize()
+    return None
+
+
+def legacy_pipeline(bot, user_input):
+    """The original get_response stages, minus picking a random reply"""
+    normalized = bot.normalize_input(user_input)
+    if any(phrase in normalized for phrase in ['my name is', 'i am', "i'm", 'call me']):
+        name = legacy_extract_name(user_input)
+        if name:
+            return 'name_tell'
+    if re.search(r'(\d+)\s*([\+\-\*/])\s*(\d+)', normalized):
+        return 'math'
+    normalized = bot.normalize_input(user_input)
+    for pattern_name, pattern_data in bot.patterns.items():
+        for keyword in pattern_data['keywords']:
+            if keyword in normalized:
+                return pattern_name
+    return None
+
+
+# ===== AFTER: SINGLE SCAN + INTENT INDEX =====
+
+def current_pipeline(bot, user_input):
+    """The current get_response stages, minus picking a random reply"""
+    normalized = bot.normalize_input(user_input)
+    name, math, tokens = scan_message(normalized)
+    if name:
+        return 'name_tell'
+    if math:
+        return 'math'
+    return bot.intent_index.best_intent(tokens, skip=('name_tell',))
+
+
+def scaled_bot(scale):
+    """
+    A chatbot whose rule set is grown scale times with synthetic intents
+    They are put before the real ones, as a match can be anywhere in a
+    large rule set
+    """
+    bot = RuleBasedChatbot()
+    patterns = {}
+    for copy in range(1, scale):
+        for name, data in bot.patterns.items():
+            patterns[f"{name}_{copy}"] = {
+                'keywords': [f"{keyword}{copy}" for keyword in data['keywords']],
+                'responses': data['responses']
+            }
+    patterns.update(bot.patterns)
+    bot.patterns = patterns
+    bot.intent_index = IntentIndex(patterns)
+    return bot
+
+
+def time_per_message(pipeline, bot, rounds):
+    """Best-of-3 average microseconds per message"""
+    best = float('inf')
+    for _ in range(3):
+        start = time.perf_counter()
+        for _ in range(rounds):
+            for message in MESSAGES:
+                pipeline(bot, message)
+        best = min(best, time.perf_counter() - start)
+    return best / (rounds * len(MESSAGES)) * 1e6
+
+
+# ===== FUZZY MATCHING =====
+
+# Ordinary words that are not keywords; correcting any of them is a mistake
+CONTROL_WORDS = [
+    'house', 'water', 'table', 'garden', 'music', 'movie', 'river', 'paper',
+    'phone', 'money', 'family', 'friend', 'school', 'window', 'coffee',
+    'night', 'light', 'green', 'black', 'sleep', 'drive', 'train', 'plane',
+    'city', 'park', 'shop', 'store', 'market', 'street', 'summer', 'winter',
+    'animal', 'flower', 'computer', 'program', 'letter', 'number', 'story',
+    'question', 'answer', 'problem', 'idea', 'people', 'world', 'country',
+    'dinner', 'chess', 'really', 'thinking', 'chatting', 'message', 'specific',
+    'rule', 'looks', 'feel', 'doing', 'right', 'about', 'what', 'this',
+    'tomorrow', 'yesterday', 'also', 'back', 'been', 'book', 'came', 'come',
+    'could', 'does', 'done', 'even', 'find', 'from', 'gave', 'give', 'gone',
+    'have', 'here', 'into', 'just', 'keep', 'kind', 'know', 'last', 'left',
+    'life', 'line', 'look', 'made', 'many', 'mean', 'more', 'most', 'much',
+    'must', 'need', 'nice', 'only', 'over', 'part', 'play', 'said', 'same',
+    'show', 'some', 'take', 'than', 'that', 'their', 'them', 'then', 'there',
+    'these', 'they', 'thing', 'think', 'those', 'told', 'took', 'very', 'want',
+    'well', 'went', 'were', 'when', 'where', 'which', 'while', 'will', 'wish',
+    'with', 'word', 'work', 'would', 'year',
+]
+
+
+def make_typos(word):
+    """One typo of each kind: a dropped, doubled, swapped and replaced letter"""
+    middle = len(word) // 2
+    return [
+        word[:middle] + word[middle + 1:],
+        word[:middle] + word[middle] + word[middle:],
+        word[:middle - 1] + word[middle] + word[middle - 1] + word[middle + 1:],
+        word[:middle] + ('e' if word[middle] == 'a' else 'a') + word[middle + 1:],
+    ]
+
+
+def typo_cases(index, patterns):
+    """
+    Keywords with one word misspelled, as (tokens, expected intent) pairs
+    The expected intent is what the correctly spelled keyword matches
+    """
+    cases = {}
+    for data in patterns.values():
+        for keyword in data['keywords']:
+            tokens = tokenize(keyword)
+            expected = index.best_intent(tokens)
+            for position, word in enumerate(tokens):
+                if len(word) < FUZZY_MIN_LENGTH:
+                    continue
+                for typo in make_typos(word):
+                    if typo not in index.vocabulary:
+                        cases[tuple(tokens[:position] + [typo] + tokens[position + 1:])] = expected
+    return list(cases.items())
+
+
+def made_up_words(count, rng):
+    """Pronounceable random words of 4 to 10 letters"""
+    consonants, vowels = 'bcdfghjklmnprstvwz', 'aeiou'
+    words = set()
+    while len(words) < count:
+        length = rng.randint(4, 10)
+        words.add(''.join(rng.choice(vowels if i % 2 else consonants) for i in range(length)))
+    return sorted(words)
+
+
+def lookup_latency(words, rng, samples=300):
+    """Average microseconds per typo lookup in a TrigramIndex of words"""
+    index = TrigramIndex(words)
+    typos = [rng.choice(make_typos(word)) for word in rng.sample(words, min(samples, len(words)))]
+    start = time.perf_counter()
+    for typo in typos:
+        index.closest(typo)
+    return (time.perf_counter() - start) / len(typos) * 1e6
+
+
+def print_fuzzy_report(word_count):
+    """Print typo tolerance accuracy and latency; returns the wrongly corrected ordinary words"""
+    patterns = RuleBasedChatbot().patterns
+    fuzzy_index = IntentIndex(patterns)
+    exact_index = IntentIndex(patterns, fuzzy=False)
+    cases = typo_cases(fuzzy_index, patterns)
+
+    print(f"\nTypo tolerance, {len(cases)} misspelled keywords:")
+    for label, index in [('exact only', exact_index), ('with typos', fuzzy_index)]:
+        right = sum(index.best_intent(list(tokens)) == expected for tokens, expected in cases)
+        print(f"  {label:<12}{right / len(cases):>7.1%} find the right intent")
+
+    controls = [word for word in CONTROL_WORDS if word not in fuzzy_index.vocabulary]
+    wrong = [word for word in controls if fuzzy_index.correct(word)]
+    print(f"  ordinary words corrected by mistake: {len(wrong)}/{len(controls)} {' '.join(wrong)}")
+
+    rng = random.Random(7)
+    print("\nTypo lookup latency:")
+    for words in [sorted(fuzzy_index.vocabulary), made_up_words(word_count, rng)]:
+        print(f"  {len(words):>6} words: {lookup_latency(words, rng):8.1f} us/lookup")
+    return wrong
+
+
+def main():
+    rounds = int(sys.argv[sys.argv.index('--rounds') + 1]) if '--rounds' in sys.argv else 2000
+    scale = int(sys.argv[sys.argv.index('--scale') + 1]) if '--scale' in sys.argv else 50
+    word_count = int(sys.argv[sys.argv.index('--words') + 1]) if '--words' in sys.argv else 5000
+
+    print(f"{len(MESSAGES)} messages x {rounds} rounds, per-message cost in microseconds\n")
+    print(f"{'rule set':<22}{'keywords':>9}{'before':>9}{'after':>9}{'speedup':>9}")
+    for size in [1, scale]:
+        bot = scaled_bot(size)
+        keywords = sum(len(data['keywords']) for data in bot.patterns.values())
+        before = time_per_message(legacy_pipeline, bot, max(1, rounds // size))
+        after = time_per_message(current_pipeline, bot, max(1, rounds // size))
+        label = 'demo' if size == 1 else f'demo x {size}'
+        print(f"{label:<22}{keywords:>9}{before:>9.2f}{after:>9.2f}{before / after:>8.1f}x")
+
+    bot = RuleBasedChatbot()
+    full = time_per_message(lambda bot, message: bot.get_response(message), bot, rounds)
+    print(f"\nfull get_response (demo rules): {full:.2f} us/message")
+    bot.enable_metrics()
+    measured = time_per_message(lambda bot, message: bot.get_response(message), bot, rounds)
+    print(f"  with metrics enabled:         {measured:.2f} us/message")
+
+    if print_fuzzy_report(word_count):
+        print("\nFAILED: ordinary words were corrected into keywords", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""
+Chatbot Server
+Serves many users at once over a TCP line protocol
+
+Every line in either direction is one JSON object:
+    request:  {"session": "<id>", "text": "<message>"}
+    reply:    {"session": "<id>", "reply": "<response>"}
+    error:    {"error": "<message>"}
+
+Session ids are chosen by the client; an unknown id starts a new session.
+Many sessions can share one connection. A session survives reconnecting
+and is dropped after --idle seconds without messages.
+
+All sessions share one chatbot (and so one compiled rule set); only the
+small ChatSession objects are per user. Editing the rule file reloads the
+rules within a second, keeping every session.
+
+With --metrics PORT the pipeline metrics are collected and served over
+HTTP on that port: /metrics in the Prometheus text format, /metrics.json
+as JSON.
+
+Usage: python chat_server.py [--host HOST] [--port PORT] [--idle SECONDS]
+                             [--rules FILE] [--metrics PORT]
+"""
+
+import asyncio
+import json
+import sys
+import time
+
+from chatbot import ChatSession, RuleBasedChatbot
+
+MAX_LINE_BYTES = 64 * 1024
+
+
+class SessionStore:
+    """All live sessions, with eviction of the idle ones"""
+
+    def __init__(self, idle_timeout=600):
+        self.sessions = {}
+        self.idle_timeout = idle_timeout
+        self.evicted = 0
+
+    def get(self, session_id):
+        """Return a session, creating it on first use"""
+        session = self.sessions.get(session_id)
+        if session is None:
+            session = ChatSession()
+            self.sessions[session_id] = session
+        return session
+
+    def evict_idle(self):
+        """Drop sessions that have been quiet for longer than the timeout"""
+        cutoff = time.monotonic() - self.idle_timeout
+        idle = [session_id for session_id, session in self.sessions.items() if session.last_active < cutoff]
+        for session_id in idle:
+            del self.sessions[session_id]
+        self.evicted += len(idle)
+        return len(idle)
+
+
+class ChatServer:
+    def __init__(self, idle_timeout=600, rules_path=None):
+        """One chatbot and one session store shared by every connection"""
+        self.bot = RuleBasedChatbot(rules_path)
+        self.store = SessionStore(idle_timeout)
+        self.messages = 0
+
+    def handle_line(self, line):
+        """Answer one request line, returning the reply line"""
+        try:
+            request = json.loads(line)
+            session_id = str(request['session'])
+            text = str(request['text'])
+        except (ValueError, KeyError, TypeError):
+            return json.dumps({'error': 'expected {"session": ..., "text": ...}'})
+
+        response = self.bot.get_response(text, self.store.get(session_id))
+        self.messages += 1
+        return json.dumps({'session': session_id, 'reply': response})
+
+    async def handle_client(self, reader, writer):
+        """Serve one TCP connection until it disconnects"""
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                writer.write(self.handle_line(line).encode() + b'\n')
+                await writer.drain()
+        except (ConnectionResetError, BrokenPipeError, ValueError):
+            pass  # ValueError: line longer than MAX_LINE_BYTES
+        finally:
+            writer.close()
+
+    async def handle_metrics_request(self, reader, writer):
+        """Answer one HTTP request for the metrics"""
+        try:
+            request_line = (await reader.readline()).split()
+            while (await reader.readline()).strip():
+                pass  # Headers are not needed
+            path = request_line[1].decode() if len(request_line) > 1 else ''
+
+            metrics = self.bot.metrics
+            if path == '/metrics':
+                status, content_type, body = '200 OK', 'text/plain; version=0.0.4', metrics.to_prometheus()
+            elif path == '/metrics.json':
+                status, content_type, body = '200 OK', 'application/json', metrics.to_json()
+            else:
+                status, content_type, body = '404 Not Found', 'text/plain', 'Try /metrics or /metrics.json\n'
+
+            body = body.encode()
+            writer.write(f"HTTP/1.0 {status}\r\nContent-Type: {content_type}\r\n"
+                         f"Content-Length: {len(body)}\r\n\r\n".encode() + body)
+            await writer.drain()
+        except (ConnectionResetError, BrokenPipeError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def evict_idle_sessions(self):
+        """Background task: periodically drop idle sessions"""
+        interval = max(1, min(60, self.store.idle_timeout / 4))
+        while True:
+            await asyncio.sleep(interval)
+            self.store.evict_idle()
+
+    async def serve(self, host='127.0.0.1', port=8766, metrics_port=None):
+        """Start the server and keep serving until cancelled"""
+        server = await asyncio.start_server(self.handle_client, host, port, limit=MAX_LINE_BYTES)
+        evictor = asyncio.create_task(self.evict_idle_sessions())
+        address = server.sockets[0].getsockname()
+        print(f"Serving {self.bot.bot_name} on {address[0]}:{address[1]}", flush=True)
+
+        metrics_server = None
+        if metrics_port is not None:
+            self.bot.enable_metrics()
+            metrics_server = await asyncio.start_server(self.handle_metrics_request, host, metrics_port)
+            print(f"Metrics on http://{host}:{metrics_port}/metrics", flush=True)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            evictor.cancel()
+            if metrics_server is not None:
+                metrics_server.close()
+
+
+def main():
+    host = sys.argv[sys.argv.index('--host') + 1] if '--host' in sys.argv else '127.0.0.1'
+    port = int(sys.argv[sys.argv.index('--port') + 1]) if '--port' in sys.argv else 8766
+    idle = float(sys.argv[sys.argv.index('--idle') + 1]) if '--idle' in sys.argv else 600
+    rules_path = sys.argv[sys.argv.index('--rules') + 1] if '--rules' in sys.argv else None
+    metrics_port = int(sys.argv[sys.argv.index('--metrics') + 1]) if '--metrics' in sys.argv else None
+
+    try:
+        asyncio.run(ChatServer(idle, rules_path).serve(host, port, metrics_port))
+    except KeyboardInterrupt:
+        print("\nServer stopped")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,176 +3,310 @@ Rule-Based Chatbot with Pattern Matching
 A simple conversational AI using if-else rules and pattern matching
 """
 
+import hashlib
+import json
+import os
+import pickle
 import re
 import random
+import time
+from collections import deque
 from datetime import datetime
 
+from arithmetic import EXPRESSION_PATTERN, MathError, check_surroundings, evaluate
+from classifier import available as classifier_available
+from intents import RuleSet, tokenize
+from metrics import ChatMetrics
 
-class RuleBasedChatbot:
+
+# ===== PRECOMPILED PATTERNS =====
+# Compiled once at import instead of on every message
+
+WHITESPACE_PATTERN = re.compile(r'\s+')
+
+# Name introductions, e.g. "my name is sam" -> "sam"
+NAME_PATTERN = re.compile(r"\b(?:my name is|i am|i'm|call me|this is) (\w+)")
+
+# Arithmetic, e.g. "12 * 4" or "(1.5 + 2) ^ 2"
+MATH_PATTERN = re.compile(EXPRESSION_PATTERN)
+
+# One pass over a message (with apostrophes dropped) finds a name
+# introduction, a math expression and the words for intent matching.
+# At each position the alternatives are tried in order, and plain words
+# are consumed whole, so introductions only match at the start of a word.
+# Groups: (name, math, word)
+MESSAGE_SCANNER = re.compile(
+    r"\b(?:my name is|i am|im|call me) (?P<name>\w+)"
+    rf"|(?P<math>{EXPRESSION_PATTERN})"
+    r"|(?P<word>[a-z]+|[0-9]+)"
+)
+
+DEFAULT_RESPONSES = [
+    "That's interesting! Tell me more.",
+    "I see. Can you elaborate on that?",
+    "Hmm, I'm not sure I understand. Could you rephrase?",
+    "That's a good point! What else is on your mind?",
+    "I don't have a specific response for that, but I'm listening!",
+    "Interesting! I'm still learning. Try asking me something else!",
+]
+
+
+def scan_message(normalized):
+    """
+    Scan normalized text once with MESSAGE_SCANNER
+    Returns (name, math, tokens): the introduced name or None, the first
+    math expression as (scanned text, start, end) or None, and the word tokens
+    """
+    name = None
+    math = None
+    tokens = []
+    text = normalized.replace("'", "")
+    
+    for match in MESSAGE_SCANNER.finditer(text):
+        intro_name, expression, word = match.groups()
+        if word:
+            tokens.append(word)
+        elif intro_name:
+            if name is None:
+                name = intro_name
+        elif math is None:
+            math = (text, match.start('math'), match.end('math'))
+    
+    return name, math, tokens
+
+
+# ===== RULE FILES =====
+# Rules live in a JSON (or YAML) file:
+#     {"bot_name": "...", "patterns": {"<intent>": {"keywords": [...], "responses": [...]}}}
+# Responses may use {name}, {bot_name}, {time}, {date} and {weekday}, which
+# are filled in when the response is given. An intent may also list
+# "examples": sample messages that teach the fallback classifier.
+#
+# Compiling a file gives a RuleSet, which is also saved as a pickled snapshot
+# named after a hash of the file, so the next start with an unchanged file
+# just loads the snapshot. RuleSet lives in intents.py, so a snapshot names
+# it the same way whichever script started the bot.
+
+CHATBOT_DIR = os.path.dirname(os.path.abspath(__file__))
+RULES_PATH = os.path.join(CHATBOT_DIR, 'rules.json')
+RULES_CACHE_DIR = os.path.join(CHATBOT_DIR, '.rules_cache')
+
+# Modules defining the classes pickled in a snapshot; their source is part
+# of the snapshot key, so snapshots made by older code are never loaded
+SNAPSHOT_SOURCES = ('chatbot.py', 'intents.py', 'classifier.py', 'fuzzy.py')
+_code_fingerprint = None
+
+# Intents the chatbot's own logic relies on
+REQUIRED_INTENTS = ('name_tell', 'goodbye')
+
+# Example values used to check the placeholders in responses
+PLACEHOLDERS = {'name': '', 'bot_name': '', 'time': '', 'date': '', 'weekday': ''}
+
+
+def parse_rules(path, content):
+    """
+    Parse and check the contents of a rule file
+    Returns (bot_name, patterns); raises ValueError if the rules are invalid
+    """
+    if path.endswith(('.yaml', '.yml')):
+        try:
+            import yaml
+        except ImportError:
+            raise ValueError("YAML rule files need PyYAML (pip install pyyaml)") from None
+        try:
+            data = yaml.safe_load(content)
+        except yaml.YAMLError as error:
+            raise ValueError(f"{path}: {error}") from None
+    else:
+        data = json.loads(content)  # json.JSONDecodeError is a ValueError
+    
+    if not isinstance(data, dict) or not isinstance(data.get('patterns'), dict):
+        raise ValueError(f"{path}: expected an object with a 'patterns' object")
+    
+    patterns = data['patterns']
+    for name, rule in patterns.items():
+        if not isinstance(rule, dict) or not rule.get('keywords') or not rule.get('responses'):
+            raise ValueError(f"{path}: intent '{name}' needs 'keywords' and 'responses' lists")
+        if not isinstance(rule.get('examples', []), list):
+            raise ValueError(f"{path}: intent '{name}' has 'examples' that are not a list")
+        for response in rule['responses']:
+            try:
+                response.format(**PLACEHOLDERS)
+            except (KeyError, IndexError, ValueError):
+                raise ValueError(f"{path}: intent '{name}' has a bad placeholder in {response!r}") from None
+    
+    missing = [name for name in REQUIRED_INTENTS if name not in patterns]
+    if missing:
+        raise ValueError(f"{path}: missing intents {', '.join(missing)}")
+    
+    return str(data.get('bot_name', 'ChatBot')), patterns
+
+
+def code_fingerprint():
+    """Hash of the SNAPSHOT_SOURCES (and of NumPy being there), computed once"""
+    global _code_fingerprint
+    if _code_fingerprint is None:
+        digest = hashlib.sha256()
+        for name in SNAPSHOT_SOURCES:
+            try:
+                with open(os.path.join(CHATBOT_DIR, name), 'rb') as f:
+                    digest.update(f.read())
+            except OSError:
+                pass  # Installed without sources: only the rule file is hashed
+        # A snapshot made without NumPy has no classifier
+        digest.update(b'numpy' if classifier_available() else b'')
+        _code_fingerprint = digest.digest()
+    return _code_fingerprint
+
+
+def load_rule_set(path, cache_dir=RULES_CACHE_DIR):
+    """
+    Load a rule file as a RuleSet, from its snapshot if there is one
+    Returns (rules, source, digest): source is 'cache' or 'compiled' and
+    digest is the hash of the file (and of the code compiling it)
+    """
+    with open(path, 'rb') as f:
+        content = f.read()
+    digest = hashlib.sha256(code_fingerprint() + content).hexdigest()
+    
+    # Snapshots are named after the file and a hash of its absolute path, so
+    # rule files with the same name in different places keep their own
+    location = hashlib.sha256(os.path.abspath(path).encode('utf-8')).hexdigest()[:8]
+    prefix = f"{os.path.splitext(os.path.basename(path))[0]}-{location}-"
+    snapshot_path = os.path.join(cache_dir, prefix + digest[:16] + '.pickle')
+    try:
+        with open(snapshot_path, 'rb') as f:
+            return pickle.load(f), 'cache', digest
+    except Exception:
+        pass  # No snapshot yet, or one that can't be unpickled: compile the file
+    
+    rules = RuleSet(*parse_rules(path, content.decode('utf-8')))
+    
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        # Write to a temporary file first so readers never see a half-written snapshot
+        tmp_path = snapshot_path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(rules, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, snapshot_path)
+    
+        # Snapshots of older versions of the file are no longer needed
+        for name in os.listdir(cache_dir):
+            if name.startswith(prefix) and name.endswith('.pickle') and name != os.path.basename(snapshot_path):
+                os.remove(os.path.join(cache_dir, name))
+    except OSError:
+        pass  # Read-only install or similar: just compile on every start
+    
+    return rules, 'compiled', digest
+
+
+class ChatSession:
+    """
+    Per-user conversation state, kept apart from the (shared) rules so one
+    chatbot can serve many users at once
+    """
+    __slots__ = ('user_name', 'history', 'last_active')
+    
+    # Only the most recent exchanges are kept
+    HISTORY_LENGTH = 20
+    
     def __init__(self):
-        """Initialize the chatbot with predefined rules and responses"""
-        self.bot_name = "ChatBot"
         self.user_name = None
+        self.history = deque(maxlen=self.HISTORY_LENGTH)  # (user input, response) pairs
+        self.last_active = time.monotonic()
+
+
+class RuleBasedChatbot:
+    def __init__(self, rules_path=None, reload_interval=1.0):
+        """
+        Initialize the chatbot with the rules and responses in a rule file
+        The file is checked for changes at most every reload_interval
+        seconds and reloaded when it changes (None turns this off)
+        """
+        self.user_name = None
+        self.rules_path = rules_path or RULES_PATH
+        self.reload_interval = reload_interval
         
-        # Define response patterns
-        # Each pattern has keywords and possible responses
-        self.patterns = {
-            'greeting': {
-                'keywords': ['hello', 'hi', 'hey', 'greetings', 'good morning', 'good afternoon', 'good evening', 'sup', 'whats up'],
-                'responses': [
-                    "Hello! How can I help you today?",
-                    "Hi there! What's on your mind?",
-                    "Hey! Nice to meet you. How are you?",
-                    "Greetings! How may I assist you?",
-                ]
-            },
-            'name_query': {
-                'keywords': ['your name', 'who are you', 'what are you called', 'what is your name'],
-                'responses': [
-                    f"I'm {self.bot_name}, your friendly chatbot assistant!",
-                    f"You can call me {self.bot_name}. I'm here to chat with you!",
-                    f"My name is {self.bot_name}. Nice to meet you!",
-                ]
-            },
-            'name_tell': {
-                'keywords': ['my name is', 'i am', "i'm", 'call me', 'this is'],
-                'responses': [
-                    "Nice to meet you, {name}!",
-                    "Hello {name}! That's a lovely name.",
-                    "Great to know you, {name}!",
-                ]
-            },
-            'how_are_you': {
-                'keywords': ['how are you', 'how do you do', 'how are things', 'hows it going'],
-                'responses': [
-                    "I'm doing great, thanks for asking! How about you?",
-                    "I'm wonderful! Just here to help. How are you?",
-                    "I'm excellent! Ready to chat. How's your day going?",
-                ]
-            },
-            'feeling_good': {
-                'keywords': ['good', 'great', 'fine', 'excellent', 'wonderful', 'awesome', 'fantastic', 'amazing'],
-                'responses': [
-                    "That's wonderful to hear!",
-                    "I'm so glad you're feeling good!",
-                    "Awesome! Keep that positive energy!",
-                    "That's great! What's making your day so good?",
-                ]
-            },
-            'feeling_bad': {
-                'keywords': ['bad', 'sad', 'terrible', 'awful', 'not good', 'down', 'depressed', 'upset'],
-                'responses': [
-                    "I'm sorry to hear that. Want to talk about it?",
-                    "That's tough. I'm here to listen if you need.",
-                    "I hope things get better soon. Is there anything I can do?",
-                ]
-            },
-            'time': {
-                'keywords': ['time', 'what time', 'current time', 'clock'],
-                'responses': [
-                    f"The current time is {datetime.now().strftime('%I:%M %p')}",
-                ]
-            },
-            'date': {
-                'keywords': ['date', 'what date', 'today', 'day'],
-                'responses': [
-                    f"Today is {datetime.now().strftime('%B %d, %Y')}",
-                    f"The date today is {datetime.now().strftime('%A, %B %d, %Y')}",
-                ]
-            },
-            'weather': {
-                'keywords': ['weather', 'temperature', 'forecast', 'rain', 'sunny'],
-                'responses': [
-                    "I don't have access to real-time weather data, but you can check a weather website!",
-                    "I wish I could tell you! Try checking weather.com or your local news.",
-                    "I'm not connected to weather services, but I hope it's nice where you are!",
-                ]
-            },
-            'joke': {
-                'keywords': ['joke', 'funny', 'make me laugh', 'tell me something funny'],
-                'responses': [
-                    "Why don't scientists trust atoms? Because they make up everything!",
-                    "What do you call a bear with no teeth? A gummy bear!",
-                    "Why did the scarecrow win an award? He was outstanding in his field!",
-                    "What do you call a fake noodle? An impasta!",
-                    "Why don't eggs tell jokes? They'd crack each other up!",
-                ]
-            },
-            'help': {
-                'keywords': ['help', 'what can you do', 'commands', 'capabilities', 'features'],
-                'responses': [
-                    "I can chat about various topics! Try asking me about:\n- The time or date\n- How I'm doing\n- Tell me a joke\n- Math calculations\n- Or just chat casually!",
-                    "I'm here to chat! Ask me questions, tell me about your day, or ask for a joke!",
-                ]
-            },
-            'thanks': {
-                'keywords': ['thank', 'thanks', 'thank you', 'appreciate', 'thx'],
-                'responses': [
-                    "You're welcome!",
-                    "Happy to help!",
-                    "Anytime! That's what I'm here for.",
-                    "My pleasure!",
-                ]
-            },
-            'goodbye': {
-                'keywords': ['bye', 'goodbye', 'see you', 'exit', 'quit', 'leave', 'later'],
-                'responses': [
-                    "Goodbye! It was nice chatting with you!",
-                    "See you later! Have a great day!",
-                    "Bye! Come back anytime!",
-                    "Take care! Chat with you soon!",
-                ]
-            },
-            'age': {
-                'keywords': ['your age', 'how old', 'age'],
-                'responses': [
-                    "I'm ageless! I exist in the digital realm.",
-                    "I was just created, so I'm very young!",
-                    "Age is just a number, especially for a chatbot like me!",
-                ]
-            },
-            'hobby': {
-                'keywords': ['hobby', 'hobbies', 'what do you like', 'interests'],
-                'responses': [
-                    "I love chatting with people like you!",
-                    "My favorite hobby is learning from conversations!",
-                    "I enjoy helping people and answering questions!",
-                ]
-            },
-            'food': {
-                'keywords': ['food', 'eat', 'hungry', 'meal', 'favorite food'],
-                'responses': [
-                    "I don't eat, but I hear pizza is amazing!",
-                    "I run on electricity, not food! But I'd love to hear about your favorite dish.",
-                    "I can't taste food, but I enjoy learning about different cuisines!",
-                ]
-            },
-            'compliment': {
-                'keywords': ['smart', 'intelligent', 'clever', 'awesome', 'cool', 'amazing bot'],
-                'responses': [
-                    "Thank you! You're pretty awesome yourself!",
-                    "That's so kind of you to say!",
-                    "Aww, you're making me blush! 😊",
-                    "Thanks! I try my best to be helpful!",
-                ]
-            },
-            'insult': {
-                'keywords': ['stupid', 'dumb', 'useless', 'bad bot', 'terrible'],
-                'responses': [
-                    "I'm sorry I couldn't help better. Let me try again!",
-                    "I'm still learning. How can I improve?",
-                    "I apologize if I disappointed you. What can I do better?",
-                ]
-            },
-            'love': {
-                'keywords': ['love you', 'i love', 'you are the best'],
-                'responses': [
-                    "Aww, that's sweet! I'm here whenever you need me!",
-                    "I appreciate your kindness!",
-                    "You're wonderful too!",
-                ]
-            },
-        }
+        # How the current rules were loaded, for monitoring reloads
+        self.rules_info = {'path': self.rules_path, 'hash': None, 'source': None,
+                           'load_ms': 0.0, 'reloads': 0, 'error': None}
+        self._rules_mtime = None
+        self._next_reload_check = 0.0
+        
+        # A ChatMetrics while metrics are enabled (see enable_metrics)
+        self.metrics = None
+        
+        self.load_rules()
+    
+    def load_rules(self):
+        """
+        Load (or reload) the rule file, raising OSError or ValueError if it
+        is missing or invalid
+        Sessions live outside the chatbot, so a reload never drops them
+        """
+        start = time.perf_counter()
+        mtime = os.stat(self.rules_path).st_mtime_ns
+        rules, source, digest = load_rule_set(self.rules_path)
+        
+        # Reloads happen before a message is handled, never during one
+        self.bot_name = rules.bot_name
+        self.patterns = rules.patterns
+        self.intent_index = rules.intent_index
+        self.classifier = rules.classifier
+        
+        self._rules_mtime = mtime
+        self.rules_info.update(hash=digest, source=source, error=None,
+                               load_ms=(time.perf_counter() - start) * 1000)
+    
+    def reload_if_changed(self):
+        """
+        Reload the rule file if it changed since it was loaded
+        Returns True if new rules were loaded. A broken file is reported in
+        rules_info['error'] and the current rules are kept.
+        """
+        now = time.monotonic()
+        if now < self._next_reload_check:
+            return False
+        self._next_reload_check = now + self.reload_interval
+        
+        try:
+            mtime = os.stat(self.rules_path).st_mtime_ns
+        except OSError:
+            return False
+        if mtime == self._rules_mtime:
+            return False
+        
+        try:
+            self.load_rules()
+        except (OSError, ValueError) as error:
+            self._rules_mtime = mtime  # Don't retry until the file changes again
+            self.rules_info['error'] = str(error)
+            return False
+        self.rules_info['reloads'] += 1
+        return True
+    
+    def enable_metrics(self):
+        """Start collecting pipeline metrics; returns the ChatMetrics"""
+        if self.metrics is None:
+            self.metrics = ChatMetrics()
+        return self.metrics
+    
+    def disable_metrics(self):
+        """Stop collecting pipeline metrics"""
+        self.metrics = None
+    
+    def fill_response(self, response, state):
+        """Fill in placeholders such as {name} or {time} when a response is given"""
+        if '{' not in response:
+            return response
+        now = datetime.now()
+        return response.format(
+            name=state.user_name or 'friend',
+            bot_name=self.bot_name,
+            time=now.strftime('%I:%M %p'),
+            date=now.strftime('%B %d, %Y'),
+            weekday=now.strftime('%A'),
+        )
     
     def normalize_input(self, user_input):
         """
@@ -182,111 +316,219 @@ class RuleBasedChatbot:
         - Basic cleanup
         """
         text = user_input.lower().strip()
-        text = re.sub(r'\s+', ' ', text)  # Remove extra spaces
+        text = WHITESPACE_PATTERN.sub(' ', text)  # Remove extra spaces
         return text
     
     def extract_name(self, user_input):
         """Extract user's name from introduction"""
-        patterns = [
-            r"my name is (\w+)",
-            r"i am (\w+)",
-            r"i'm (\w+)",
-            r"call me (\w+)",
-            r"this is (\w+)",
-        ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, user_input.lower())
-            if match:
-                return match.group(1).capitalize()
+        match = NAME_PATTERN.search(user_input.lower())
+        if match:
+            return match.group(1).capitalize()
         return None
     
     def calculate_math(self, user_input):
         """Handle basic math calculations"""
         # Look for simple math patterns
-        match = re.search(r'(\d+)\s*([\+\-\*/])\s*(\d+)', user_input)
+        match = MATH_PATTERN.search(user_input)
         if match:
-            num1 = float(match.group(1))
-            operator = match.group(2)
-            num2 = float(match.group(3))
-            
-            if operator == '+':
-                result = num1 + num2
-            elif operator == '-':
-                result = num1 - num2
-            elif operator == '*':
-                result = num1 * num2
-            elif operator == '/':
-                if num2 != 0:
-                    result = num1 / num2
-                else:
-                    return "I can't divide by zero!"
-            
-            return f"The answer is {result}"
+            return self.solve_math(user_input, *match.span())
         return None
     
+    def solve_math(self, text, start=0, end=None):
+        """
+        Compute the arithmetic expression text[start:end] and phrase the answer
+        An expression cut out of a longer one (nested too deep, or with an
+        operator left over) is refused rather than answered in part
+        """
+        end = len(text) if end is None else end
+        try:
+            check_surroundings(text, start, end)
+            result = evaluate(text[start:end])
+        except ZeroDivisionError:
+            return "I can't divide by zero!"
+        except MathError as error:
+            return f"Sorry, I can't work that out: {error}."
+        
+        return f"The answer is {result}"
+    
     def find_pattern_match(self, user_input):
         """
         Find matching pattern based on keywords
         This is the core of the rule-based system
         """
-        normalized = self.normalize_input(user_input)
+        return self.match_normalized(self.normalize_input(user_input))
+    
+    def match_normalized(self, normalized, skip=()):
+        """
+        Find the best matching pattern for already normalized input
+        Every matching keyword adds to its intent's score and the highest
+        score wins, so 'good morning' is a greeting rather than a feeling
+        """
+        return self.intent_index.best_intent(tokenize(normalized), skip)
+    
+    def get_response(self, user_input, session=None):
+        """
+        Generate response based on user input
+        With a ChatSession, the user's name and history are kept in the
+        session instead of on the chatbot, so one chatbot can serve many users
+        """
+        if session is None:
+            return self.respond(user_input, self)
         
-        # Check each pattern category
-        for pattern_name, pattern_data in self.patterns.items():
-            keywords = pattern_data['keywords']
-            
-            # Check if any keyword matches
-            for keyword in keywords:
-                if keyword in normalized:
-                    return pattern_name
+        response = self.respond(user_input, session)
+        session.history.append((user_input, response))
+        session.last_active = time.monotonic()
+        return response
+    
+    def get_responses(self, user_inputs, session=None):
+        """Generate responses for a batch of inputs, in order"""
+        if session is not None:
+            return list(self.iter_responses(user_inputs, session))
+    
+        answer = self.answer
+        metrics = self.metrics
+        if metrics is None:
+            answers = [answer(user_input, self) for user_input in user_inputs]
+        else:
+            answers = []
+            seconds = []
+            for user_input in user_inputs:
+                start = time.perf_counter()
+                answers.append(answer(user_input, self))
+                seconds.append(time.perf_counter() - start)
+        responses = [response for response, _ in answers]
         
-        return None
+        # Messages no rule matched go through the fallback classifier together
+        unmatched = [i for i, response in enumerate(responses) if response is None]
+        if metrics is not None:
+            start = time.perf_counter()
+        fallbacks = self.fallback_responses([answers[i][1] for i in unmatched], self)
+        for i, response in zip(unmatched, fallbacks):
+            responses[i] = response
+        
+        if metrics is not None:
+            share = (time.perf_counter() - start) / len(unmatched) if unmatched else 0.0
+            for i in unmatched:
+                seconds[i] += share
+            for message_seconds in seconds:
+                metrics.message_done(message_seconds)
+        return responses
     
-    def get_response(self, user_input):
+    def iter_responses(self, user_inputs, session=None):
+        """
+        Generate responses one at a time as inputs arrive
+        Inputs are read lazily, so a long stream never has to fit in memory
+        """
+        for user_input in user_inputs:
+            yield self.get_response(user_input, session)
+    
+    def respond(self, user_input, state):
         """
-        Generate response based on user input
         Main logic of the chatbot
+        state is whatever holds user_name: a ChatSession or the chatbot itself
         """
+        metrics = self.metrics
+        if metrics is not None:
+            start = time.perf_counter()
+        
+        response, tokens = self.answer(user_input, state)
+        if response is None:
+            response = self.fallback_responses([tokens], state)[0]
+        
+        if metrics is not None:
+            metrics.message_done(time.perf_counter() - start)
+        return response
+    
+    def answer(self, user_input, state):
+        """
+        Answer from the rules alone
+        Returns (response, tokens); response is None if nothing matched,
+        leaving the message to fallback_responses()
+        """
+        if self.reload_interval is not None:
+            self.reload_if_changed()
+        
+        # Stage timings are only taken while metrics are enabled
+        metrics = self.metrics
+        if metrics is not None:
+            mark = time.perf_counter()
+        
         # Normalize input
         normalized = self.normalize_input(user_input)
+        if metrics is not None:
+            mark = metrics.lap('normalize', mark)
         
         # Check for empty input
         if not normalized:
-            return "I didn't catch that. Could you say something?"
+            if metrics is not None:
+                metrics.hit('empty')
+            return "I didn't catch that. Could you say something?", []
+        
+        # One scan finds a name introduction, a math expression and the words
+        name, math, tokens = scan_message(normalized)
+        if metrics is not None:
+            mark = metrics.lap('scan', mark)
         
         # Check for name introduction
-        if any(phrase in normalized for phrase in ['my name is', 'i am', "i'm", 'call me']):
-            name = self.extract_name(user_input)
-            if name:
-                self.user_name = name
-                responses = self.patterns['name_tell']['responses']
-                response = random.choice(responses)
-                return response.format(name=name)
+        if name:
+            name = name.capitalize()
+            state.user_name = name
+            responses = self.patterns['name_tell']['responses']
+            if metrics is not None:
+                metrics.hit('name_tell')
+            return self.fill_response(random.choice(responses), state), tokens
         
         # Check for math calculation
-        math_result = self.calculate_math(normalized)
-        if math_result:
-            return math_result
+        if math:
+            response = self.solve_math(*math)
+            if metrics is not None:
+                metrics.lap('math', mark)
+                metrics.hit('math')
+            return response, tokens
         
-        # Find pattern match
-        pattern_match = self.find_pattern_match(user_input)
+        # Find pattern match (name introductions were handled above; their
+        # responses need a name, so they are not picked here)
+        pattern_match = self.intent_index.best_intent(tokens, skip=('name_tell',))
+        if metrics is not None:
+            metrics.lap('match', mark)
+            if pattern_match:
+                metrics.hit(pattern_match)
         
         if pattern_match:
             responses = self.patterns[pattern_match]['responses']
-            return random.choice(responses)
+            return self.fill_response(random.choice(responses), state), tokens
+        
+        return None, tokens
+    
+    def fallback_responses(self, token_lists, state):
+        """
+        Responses for messages no rule matched
+        The classifier guesses their intents in one batch; messages it
+        isn't confident about get a default response
+        """
+        metrics = self.metrics
+        if metrics is not None:
+            start = time.perf_counter()
+        
+        if self.classifier is None:
+            intents = [None] * len(token_lists)
+        else:
+            intents = [intent for intent, _ in self.classifier.classify_batch(token_lists, skip=('name_tell',))]
         
-        # Default response for unrecognized input
-        default_responses = [
-            "That's interesting! Tell me more.",
-            "I see. Can you elaborate on that?",
-            "Hmm, I'm not sure I understand. Could you rephrase?",
-            "That's a good point! What else is on your mind?",
-            "I don't have a specific response for that, but I'm listening!",
-            "Interesting! I'm still learning. Try asking me something else!",
-        ]
+        responses = []
+        for intent in intents:
+            if intent:
+                responses.append(self.fill_response(random.choice(self.patterns[intent]['responses']), state))
+            else:
+                responses.append(random.choice(DEFAULT_RESPONSES))
         
-        return random.choice(default_responses)
+        if metrics is not None and intents:
+            # A batch is classified at once, so each message gets an equal share
+            share = (time.perf_counter() - start) / len(intents)
+            for intent in intents:
+                metrics.observe('fallback', share)
+                metrics.fallback(intent)
+        return responses
     
     def chat(self):
         """Main chat loop"""
@@ -307,7 +549,7 @@ class RuleBasedChatbot:
             
             # Check for exit commands
             if self.normalize_input(user_input) in ['bye', 'goodbye', 'exit', 'quit']:
-                print(f"\n{self.bot_name}: " + random.choice(self.patterns['goodbye']['responses']))
+                print(f"\n{self.bot_name}: " + self.fill_response(random.choice(self.patterns['goodbye']['responses']), self))
                 print("\nThanks for chatting! 👋\n")
                 break
             
@@ -0,0 +1,95 @@
+"""
+TF-IDF Fallback Classifier
+Guesses the intent of a message that matched no keyword
+
+Each intent's keywords and example utterances become one TF-IDF vector
+(a row of a NumPy matrix, built once when the rules are compiled). A
+message is scored against every intent with one matrix-vector product
+(cosine similarity), and a batch of messages with one matrix product.
+The best intent is only used if its similarity reaches the threshold.
+
+NumPy is optional: without it there is no classifier and unmatched
+messages get a default response as before.
+"""
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Minimum cosine similarity to trust the best intent
+CONFIDENCE_THRESHOLD = 0.35
+
+
+def available():
+    """Whether the classifier can be used (NumPy is installed)"""
+    return np is not None
+
+
+class IntentClassifier:
+    def __init__(self, documents, threshold=CONFIDENCE_THRESHOLD):
+        """
+        Build the intent x word TF-IDF matrix
+        documents maps each intent name to the words of all its text
+        """
+        self.intent_names = list(documents)
+        self.rank_of = {name: rank for rank, name in enumerate(self.intent_names)}
+        self.threshold = threshold
+
+        self.vocabulary = {}  # word -> column
+        for words in documents.values():
+            for word in words:
+                self.vocabulary.setdefault(word, len(self.vocabulary))
+
+        counts = self._count(list(documents.values()))
+
+        # Words used by few intents tell them apart best
+        document_frequency = (counts > 0).sum(axis=0)
+        self.idf = np.log((1 + len(documents)) / (1 + document_frequency)) + 1
+        self.weights = self._tfidf(counts)
+
+    def _count(self, token_lists):
+        """Matrix of word counts, one row per token list"""
+        counts = np.zeros((len(token_lists), len(self.vocabulary)))
+        vocabulary = self.vocabulary
+        for row, tokens in enumerate(token_lists):
+            for token in tokens:
+                column = vocabulary.get(token)
+                if column is not None:
+                    counts[row, column] += 1
+        return counts
+
+    def _tfidf(self, counts):
+        """Turn counts into unit-length TF-IDF rows (a repeated word counts less each time)"""
+        weights = np.log(counts, out=np.zeros_like(counts), where=counts > 0)
+        weights[counts > 0] += 1
+        weights *= self.idf
+        norms = np.linalg.norm(weights, axis=1, keepdims=True)
+        norms[norms == 0] = 1
+        return weights / norms
+
+    def classify_batch(self, token_lists, skip=()):
+        """
+        Classify many tokenized messages at once
+        Returns (intent name or None, confidence) for each message; the
+        intent is None when its confidence is below the threshold.
+        Intents named in skip are left out.
+        """
+        if not token_lists:
+            return []
+
+        features = self._tfidf(self._count(token_lists))
+        scores = features @ self.weights.T  # messages x intents
+        for name in skip:
+            scores[:, self.rank_of[name]] = -1
+
+        best = scores.argmax(axis=1)
+        confidence = scores[np.arange(len(token_lists)), best]
+        return [
+            (self.intent_names[rank] if score >= self.threshold else None, float(score))
+            for rank, score in zip(best, confidence)
+        ]
+
+    def classify(self, tokens, skip=()):
+        """Classify one tokenized message, returning (intent name or None, confidence)"""
+        return self.classify_batch([tokens], skip)[0]
@@ -0,0 +1,106 @@
+"""
+Typo-Tolerant Word Lookup
+Finds the known word closest to a misspelled one, e.g. 'wether' -> 'weather'
+
+Known words are indexed by their trigrams (3-letter pieces of the word,
+padded so its start and end count too). A misspelling still shares most
+trigrams with the word that was meant, so only the few words sharing
+enough of them are compared letter by letter. This keeps a lookup well
+under a millisecond with thousands of known words.
+"""
+
+from collections import Counter
+from itertools import chain
+
+
+def trigrams(word):
+    """The set of 3-letter pieces of a padded word: 'hi' -> {'  h', ' hi', 'hi '}"""
+    padded = f"  {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def edit_distance(a, b, limit):
+    """
+    Number of single-letter edits (insert, delete, replace or swap two
+    neighbours) turning a into b; stops early and returns limit + 1 once
+    the distance is known to be over limit
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+
+    before_previous = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        row_best = i
+        for j in range(1, len(b) + 1):
+            distance = min(
+                previous[j] + 1,                             # delete
+                current[j - 1] + 1,                          # insert
+                previous[j - 1] + (a[i - 1] != b[j - 1])     # replace
+            )
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                distance = min(distance, before_previous[j - 2] + 1)  # swap
+            current[j] = distance
+            row_best = min(row_best, distance)
+        if row_best > limit:
+            return limit + 1
+        before_previous, previous = previous, current
+
+    return previous[-1]
+
+
+class TrigramIndex:
+    """Inverted index from trigrams to the known words containing them"""
+
+    def __init__(self, words):
+        """Index a collection of known words"""
+        self.words = sorted(set(words))
+
+        # Postings are split by word length, so a lookup only reads the
+        # words whose length is close enough to matter
+        postings = {}
+        for number, word in enumerate(self.words):
+            for gram in trigrams(word):
+                postings.setdefault((gram, len(word)), []).append(number)
+        self.postings = {key: tuple(numbers) for key, numbers in postings.items()}
+
+    def closest(self, word, max_distance=1, same_first_letter=False):
+        """
+        Return the known word within max_distance edits of word, or None
+        None is also returned when several words are equally close, as
+        guessing between them would be wrong as often as right.
+        With same_first_letter, only words starting like word are candidates.
+        """
+        grams = trigrams(word)
+        lengths = range(max(1, len(word) - max_distance), len(word) + max_distance + 1)
+        postings = self.postings
+        shared_counts = Counter(chain.from_iterable(
+            postings.get((gram, length), ()) for gram in grams for length in lengths
+        ))
+
+        # One edit changes at most 4 trigrams (a swap), so a word sharing
+        # fewer than this can't be close enough
+        needed = max(1, len(grams) - 4 * max_distance)
+
+        # Closest first; among equally close words the one sharing more
+        # trigrams ('helo' is 'hello' rather than 'help')
+        best = None
+        best_rank = None
+        tied = False
+        for number, shared in shared_counts.items():
+            if shared < needed:
+                continue
+            candidate = self.words[number]
+            if same_first_letter and candidate[0] != word[0]:
+                continue
+            distance = edit_distance(word, candidate, max_distance)
+            if distance > max_distance:
+                continue
+            rank = (distance, -shared)
+            if best_rank is None or rank < best_rank:
+                best, best_rank, tied = candidate, rank, False
+            elif rank == best_rank:
+                tied = True
+
+        return None if tied else best
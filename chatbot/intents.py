@@ -0,0 +1,178 @@
+"""
+Intent Matching
+The compiled form of a rule file: an index from keywords to intents and,
+with NumPy installed, the fallback classifier
+
+These classes are what rule-file snapshots pickle. They live here rather
+than in chatbot.py so a snapshot names them the same way whether the bot
+was started as chatbot.py, chat_server.py or replay.py.
+"""
+
+import re
+
+from classifier import IntentClassifier, available as classifier_available
+from fuzzy import TrigramIndex
+
+# Words are runs of letters or of digits; apostrophes are dropped first so
+# "i'm" and "im" or "what's" and "whats" give the same token
+TOKEN_PATTERN = re.compile(r"[a-z]+|[0-9]+")
+
+# Typo tolerance: unknown words of at least FUZZY_MIN_LENGTH letters are
+# read as the closest keyword word one edit away, and count FUZZY_WEIGHT
+# times as much as a correctly typed word
+FUZZY_MIN_LENGTH = 4
+FUZZY_WEIGHT = 0.5
+CORRECTION_CACHE_SIZE = 10000
+
+# Replacing one letter turns many shorter words into other real words
+# ('think' -> 'thank', 'made' -> 'make'), so only words this long are
+# corrected that way
+FUZZY_REPLACE_MIN_LENGTH = 6
+
+
+def tokenize(text):
+    """Split normalized (lowercase) text into word tokens"""
+    return TOKEN_PATTERN.findall(text.replace("'", ""))
+
+
+def plausible_typo(token, word):
+    """
+    Whether token is more likely a misspelling of the keyword word one edit
+    away than a different real word. Typos keep the first and last letter
+    ('helo', 'wether', 'thnks'); real words one letter apart often differ
+    there ('water'/'later', 'doing'/'going', 'than'/'thank', 'them'/'the').
+    """
+    if len(word) < FUZZY_MIN_LENGTH or token[0] != word[0] or token[-1] != word[-1]:
+        return False
+    replaced = len(token) == len(word) and sum(a != b for a, b in zip(token, word)) == 1
+    return not replaced or len(token) >= FUZZY_REPLACE_MIN_LENGTH
+
+
+class IntentIndex:
+    """
+    Inverted index from keyword n-grams (1 or more words) to intents
+    A message is matched by looking up each run of 1..N of its words,
+    so the cost depends on the message length, not on the number of rules.
+    Keywords only match whole words: 'hi' no longer fires inside 'this'.
+    With fuzzy on, misspelled keyword words ('wether') still match.
+    """
+    
+    def __init__(self, patterns, fuzzy=True):
+        """Build the index from the patterns dict"""
+        self.intent_names = list(patterns)
+        
+        # Which intents use each keyword
+        owners = {}
+        for rank, name in enumerate(self.intent_names):
+            for keyword in patterns[name]['keywords']:
+                ngram = ' '.join(tokenize(keyword))
+                if ngram:
+                    owners.setdefault(ngram, set()).add(rank)
+        
+        # Each keyword scores its number of words (longer phrases are more
+        # specific), shared out among the intents that use it
+        self.index = {}
+        self.max_words = 1
+        # First words of multi-word keywords; only these start a phrase lookup
+        self.phrase_starts = set()
+        for ngram, ranks in owners.items():
+            words = ngram.count(' ') + 1
+            self.max_words = max(self.max_words, words)
+            if words > 1:
+                self.phrase_starts.add(ngram.split(' ', 1)[0])
+            self.index[ngram] = [(rank, words / len(ranks)) for rank in sorted(ranks)]
+        
+        self.rank_of = {name: rank for rank, name in enumerate(self.intent_names)}
+        
+        # Every word used in a keyword, indexed for typo lookups
+        self.vocabulary = {word for ngram in self.index for word in ngram.split(' ')}
+        self.fuzzy = TrigramIndex(self.vocabulary) if fuzzy else None
+        self.corrections = {}  # Unknown word -> keyword word or None
+    
+    def correct(self, token):
+        """Return the keyword word an unknown token is a typo of, or None"""
+        if token in self.corrections:
+            return self.corrections[token]
+        
+        correction = None
+        if len(token) >= FUZZY_MIN_LENGTH and token.isalpha():
+            candidate = self.fuzzy.closest(token, same_first_letter=True)
+            if candidate is not None and plausible_typo(token, candidate):
+                correction = candidate
+        if len(self.corrections) >= CORRECTION_CACHE_SIZE:
+            self.corrections.clear()
+        self.corrections[token] = correction
+        return correction
+    
+    def score(self, tokens):
+        """Return {intent_rank: score} for every intent a message matches"""
+        index = self.index
+        
+        # Unknown words that are a likely typo of a keyword word are read as it
+        fuzzy_positions = ()
+        if self.fuzzy is not None:
+            vocabulary = self.vocabulary
+            corrections = self.corrections
+            for position, token in enumerate(tokens):
+                if token not in vocabulary:
+                    correction = corrections[token] if token in corrections else self.correct(token)
+                    if correction:
+                        if not fuzzy_positions:
+                            tokens = list(tokens)
+                            fuzzy_positions = set()
+                        tokens[position] = correction
+                        fuzzy_positions.add(position)
+        
+        # Matched n-gram -> how much it counts (less if it holds a corrected word)
+        matched = {}
+        for start, token in enumerate(tokens):
+            if token in index:
+                factor = FUZZY_WEIGHT if start in fuzzy_positions else 1.0
+                matched[token] = max(matched.get(token, 0), factor)
+            if token in self.phrase_starts:
+                for end in range(start + 2, min(start + self.max_words, len(tokens)) + 1):
+                    ngram = ' '.join(tokens[start:end])
+                    if ngram in index:
+                        fuzzy = fuzzy_positions and not fuzzy_positions.isdisjoint(range(start, end))
+                        factor = FUZZY_WEIGHT if fuzzy else 1.0
+                        matched[ngram] = max(matched.get(ngram, 0), factor)
+        
+        scores = {}
+        for ngram, factor in matched.items():
+            for rank, weight in self.index[ngram]:
+                scores[rank] = scores.get(rank, 0) + weight * factor
+        return scores
+    
+    def best_intent(self, tokens, skip=()):
+        """
+        Return the name of the highest scoring intent, or None
+        Ties go to the intent listed first in the patterns dict.
+        Intents named in skip are left out.
+        """
+        scores = self.score(tokens)
+        for name in skip:
+            scores.pop(self.rank_of[name], None)
+        if not scores:
+            return None
+        best_rank = min(scores, key=lambda rank: (-scores[rank], rank))
+        return self.intent_names[best_rank]
+
+
+class RuleSet:
+    """
+    The rules from one rule file, compiled into an IntentIndex and (with
+    NumPy installed) a fallback IntentClassifier
+    """
+    
+    def __init__(self, bot_name, patterns):
+        self.bot_name = bot_name
+        self.patterns = patterns
+        self.intent_index = IntentIndex(patterns)
+        
+        self.classifier = None
+        if classifier_available():
+            documents = {
+                name: [word for text in rule['keywords'] + rule.get('examples', []) for word in tokenize(text.lower())]
+                for name, rule in patterns.items()
+            }
+            self.classifier = IntentClassifier(documents)
@@ -0,0 +1,132 @@
+"""
+Chatbot Server Load Test
+Simulates many users chatting with chat_server.py at once and reports
+throughput and latency percentiles
+
+Sessions share a pool of TCP connections, so thousands of users don't
+need thousands of sockets.
+
+Usage: python load_client.py [--sessions N] [--messages N] [--connections N]
+                             [--host HOST] [--port PORT] [--spawn]
+    --spawn starts a local chat_server.py for the duration of the test
+"""
+
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+
+from benchmark import MESSAGES
+
+
+class Connection:
+    """One TCP connection carrying requests for many sessions"""
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.pending = {}  # session id -> future waiting for its reply
+        self.reader_task = asyncio.create_task(self.read_replies())
+
+    async def read_replies(self):
+        """Route each reply to the request waiting on its session"""
+        while True:
+            line = await self.reader.readline()
+            if not line:
+                break
+            reply = json.loads(line)
+            future = self.pending.pop(reply.get('session'), None)
+            if future is not None and not future.done():
+                future.set_result(reply)
+
+    async def request(self, session_id, text):
+        """Send a message and wait for the reply"""
+        future = asyncio.get_running_loop().create_future()
+        self.pending[session_id] = future
+        self.writer.write(json.dumps({'session': session_id, 'text': text}).encode() + b'\n')
+        await self.writer.drain()
+        return await future
+
+    async def close(self):
+        self.writer.close()
+        self.reader_task.cancel()
+
+
+async def run_session(connection, session_id, messages, latencies, rng):
+    """Send a number of messages one after another, like a user would"""
+    for _ in range(messages):
+        start = time.perf_counter()
+        await connection.request(session_id, rng.choice(MESSAGES))
+        latencies.append(time.perf_counter() - start)
+
+
+def percentile(sorted_values, fraction):
+    """Return a percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(fraction * len(sorted_values)))
+    return sorted_values[index]
+
+
+async def run_load_test(host, port, sessions, messages, connections):
+    """Run every session concurrently, returning (latencies, seconds)"""
+    pool = []
+    for _ in range(connections):
+        reader, writer = await asyncio.open_connection(host, port)
+        pool.append(Connection(reader, writer))
+
+    latencies = []
+    rng = random.Random(42)
+    start = time.perf_counter()
+    await asyncio.gather(*[
+        run_session(pool[i % connections], f"user-{i}", messages, latencies, rng)
+        for i in range(sessions)
+    ])
+    seconds = time.perf_counter() - start
+
+    for connection in pool:
+        await connection.close()
+    return latencies, seconds
+
+
+def start_local_server(port):
+    """Start chat_server.py in a subprocess and wait until it listens"""
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'chat_server.py')
+    server = subprocess.Popen([sys.executable, script, '--port', str(port)], stdout=subprocess.PIPE, text=True)
+    server.stdout.readline()  # "Serving ChatBot on ..."
+    return server
+
+
+def main():
+    def flag_value(name, default):
+        if name in sys.argv:
+            return type(default)(sys.argv[sys.argv.index(name) + 1])
+        return default
+
+    sessions = flag_value('--sessions', 1000)
+    messages = flag_value('--messages', 10)
+    connections = min(sessions, flag_value('--connections', 50))
+    host = flag_value('--host', '127.0.0.1')
+    port = flag_value('--port', 8766)
+
+    server = start_local_server(port) if '--spawn' in sys.argv else None
+    try:
+        latencies, seconds = asyncio.run(run_load_test(host, port, sessions, messages, connections))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    latencies.sort()
+    print(f"Sessions:     {sessions} x {messages} messages over {connections} connections")
+    print(f"Messages:     {len(latencies)} in {seconds:.2f} s")
+    print(f"Throughput:   {len(latencies) / seconds:.0f} messages/sec")
+    for label, fraction in [('p50', 0.50), ('p90', 0.90), ('p99', 0.99), ('max', 1.0)]:
+        print(f"Latency {label}:  {percentile(latencies, fraction) * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+Chatbot Metrics
+Opt-in counters and latency histograms for the response pipeline
+
+Turned on with RuleBasedChatbot.enable_metrics(). While off, the pipeline
+only checks that bot.metrics is None, so it costs next to nothing.
+
+Recorded:
+    - time spent in each stage (normalize, scan, math, match, fallback)
+      and in the whole message ('total'), as histograms
+    - how often each intent answered, from the rules or the fallback classifier
+    - how many messages no rule matched, and how many got a default response
+
+A snapshot can be exported as JSON or in the Prometheus text format.
+"""
+
+import json
+import time
+from bisect import bisect_left
+
+STAGES = ('normalize', 'scan', 'math', 'match', 'fallback', 'total')
+
+# Histogram bucket upper bounds in seconds (10 us to 100 ms)
+BUCKETS = (
+    0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005,
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+)
+
+
+class ChatMetrics:
+    def __init__(self):
+        """Start with every counter at zero"""
+        self.reset()
+
+    def reset(self):
+        """Set every counter back to zero"""
+        self.started = time.time()
+        self.messages = 0
+        self.unmatched = 0  # Messages no rule matched
+        self.defaults = 0   # Messages answered with a default response
+        self.intent_hits = {}    # intent -> count, answered by the rules
+        self.fallback_hits = {}  # intent -> count, answered by the classifier
+        # stage -> [count per bucket (the last one is +Inf), count, seconds]
+        self.stages = {stage: [[0] * (len(BUCKETS) + 1), 0, 0.0] for stage in STAGES}
+
+    # ===== RECORDING =====
+
+    def observe(self, stage, seconds):
+        """Record the time one message spent in a stage"""
+        histogram = self.stages[stage]
+        histogram[0][bisect_left(BUCKETS, seconds)] += 1
+        histogram[1] += 1
+        histogram[2] += seconds
+
+    def lap(self, stage, since):
+        """Record the time since a perf_counter() reading; returns a new reading"""
+        now = time.perf_counter()
+        self.observe(stage, now - since)
+        return now
+
+    def message_done(self, seconds):
+        """Count one answered message and its total time"""
+        self.messages += 1
+        self.observe('total', seconds)
+
+    def hit(self, intent):
+        """Count a message answered by the rules ('math', 'name_tell', 'greeting', ...)"""
+        self.intent_hits[intent] = self.intent_hits.get(intent, 0) + 1
+
+    def fallback(self, intent):
+        """Count a message the rules missed: answered by the classifier, or by a default if intent is None"""
+        self.unmatched += 1
+        if intent is None:
+            self.defaults += 1
+        else:
+            self.fallback_hits[intent] = self.fallback_hits.get(intent, 0) + 1
+
+    # ===== EXPORT =====
+
+    def snapshot(self):
+        """All metrics as a JSON-serializable dict"""
+        stages = {}
+        for stage, (buckets, count, seconds) in self.stages.items():
+            cumulative = 0
+            bucket_counts = {}
+            for bound, bucket_count in zip(BUCKETS + (float('inf'),), buckets):
+                cumulative += bucket_count
+                bucket_counts['+Inf' if bound == float('inf') else f'{bound:g}'] = cumulative
+            stages[stage] = {
+                'count': count,
+                'total_ms': seconds * 1000,
+                'mean_us': seconds / count * 1e6 if count else 0.0,
+                'buckets': bucket_counts,
+            }
+
+        return {
+            'uptime_s': time.time() - self.started,
+            'messages': self.messages,
+            'unmatched': self.unmatched,
+            'unmatched_rate': self.unmatched / self.messages if self.messages else 0.0,
+            'defaults': self.defaults,
+            'intents': dict(sorted(self.intent_hits.items())),
+            'fallback_intents': dict(sorted(self.fallback_hits.items())),
+            'stages': stages,
+        }
+
+    def to_json(self):
+        """Snapshot as a JSON document"""
+        return json.dumps(self.snapshot(), indent=2)
+
+    def to_prometheus(self):
+        """Snapshot in the Prometheus text exposition format"""
+        snapshot = self.snapshot()
+        lines = [
+            '# HELP chatbot_messages_total Messages answered.',
+            '# TYPE chatbot_messages_total counter',
+            f'chatbot_messages_total {snapshot["messages"]}',
+            '# HELP chatbot_unmatched_total Messages no rule matched.',
+            '# TYPE chatbot_unmatched_total counter',
+            f'chatbot_unmatched_total {snapshot["unmatched"]}',
+            '# HELP chatbot_default_responses_total Messages answered with a default response.',
+            '# TYPE chatbot_default_responses_total counter',
+            f'chatbot_default_responses_total {snapshot["defaults"]}',
+            '# HELP chatbot_intent_hits_total Messages answered per intent.',
+            '# TYPE chatbot_intent_hits_total counter',
+        ]
+        for source, hits in [('rules', snapshot['intents']), ('fallback', snapshot['fallback_intents'])]:
+            for intent, count in hits.items():
+                lines.append(f'chatbot_intent_hits_total{{intent="{intent}",source="{source}"}} {count}')
+
+        lines.append('# HELP chatbot_stage_seconds Time spent per message in each pipeline stage.')
+        lines.append('# TYPE chatbot_stage_seconds histogram')
+        for stage, data in snapshot['stages'].items():
+            for bound, count in data['buckets'].items():
+                lines.append(f'chatbot_stage_seconds_bucket{{stage="{stage}",le="{bound}"}} {count}')
+            lines.append(f'chatbot_stage_seconds_sum{{stage="{stage}"}} {data["total_ms"] / 1000:.9f}')
+            lines.append(f'chatbot_stage_seconds_count{{stage="{stage}"}} {data["count"]}')
+
+        return '\n'.join(lines) + '\n'
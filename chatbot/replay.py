@@ -0,0 +1,163 @@
+"""
+Chat Log Replay
+Streams a chat log through the chatbot and writes one response per line
+
+Input is plain text (one message per line) or JSON lines with a "text"
+field; JSON records are written back with a "reply" field added. JSON
+lines that aren't objects are skipped with a warning on stderr. Lines are
+read and answered in chunks, so memory stays bounded however long the log.
+
+With --processes N the chunks are answered by a pool of worker processes
+and written back in input order. At most a few chunks per worker are in
+flight at once. With --seed the random choice between responses is seeded
+per chunk, so the output is the same for any number of processes.
+
+Usage: python replay.py [FILE] [--output FILE] [--jsonl] [--processes N]
+                        [--chunk N] [--seed N]
+    FILE defaults to stdin and --output to stdout; --jsonl is implied for
+    .jsonl files. Throughput is reported on stderr.
+"""
+
+import json
+import multiprocessing
+import random
+import sys
+import time
+from collections import deque
+from itertools import islice
+
+from chatbot import RuleBasedChatbot
+
+# Chunks queued per worker process: enough to keep them all busy
+CHUNKS_PER_PROCESS = 2
+
+_bot = None
+
+
+def _init_worker():
+    """Build the chatbot once per process"""
+    global _bot
+    _bot = RuleBasedChatbot()
+
+
+def _answer_chunk(job):
+    """Worker: responses for one (chunk index, messages, seed) job"""
+    index, messages, seed = job
+    if seed is not None:
+        random.seed(seed * 1000003 + index)
+    return _bot.get_responses(messages)
+
+
+def read_chunks(lines, chunk_size):
+    """Group an iterable of lines into lists of at most chunk_size lines"""
+    lines = iter(lines)
+    while True:
+        chunk = list(islice(lines, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def stream_responses(messages, processes=1, chunk_size=1000, seed=None):
+    """
+    Generate a response for every message, in input order
+    Messages are read lazily, chunk_size at a time
+    """
+    jobs = ((index, chunk, seed) for index, chunk in enumerate(read_chunks(messages, chunk_size)))
+
+    if processes == 1:
+        _init_worker()
+        for job in jobs:
+            yield from _answer_chunk(job)
+        return
+
+    with multiprocessing.Pool(processes, initializer=_init_worker) as pool:
+        # Results are collected oldest first, which keeps the input order
+        in_flight = deque()
+        for job in jobs:
+            in_flight.append(pool.apply_async(_answer_chunk, (job,)))
+            if len(in_flight) >= processes * CHUNKS_PER_PROCESS:
+                yield from in_flight.popleft().get()
+        while in_flight:
+            yield from in_flight.popleft().get()
+
+
+def read_records(source):
+    """JSON objects from the lines of source, skipping (and reporting) any line that isn't one"""
+    for line_number, line in enumerate(source, 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as error:
+            print(f"Skipped line {line_number}: invalid JSON ({error})", file=sys.stderr)
+            continue
+        if not isinstance(record, dict):
+            print(f"Skipped line {line_number}: not a JSON object", file=sys.stderr)
+            continue
+        yield record
+
+
+def replay(source, output, jsonl=False, processes=1, chunk_size=1000, seed=None):
+    """Answer every line of source, writing to output; returns the message count"""
+    if jsonl:
+        records = read_records(source)
+        # Records wait in a bounded queue until their reply comes back
+        pending = deque()
+
+        def messages():
+            for record in records:
+                pending.append(record)
+                yield str(record.get('text', ''))
+
+        count = 0
+        for reply in stream_responses(messages(), processes, chunk_size, seed):
+            record = pending.popleft()
+            record['reply'] = reply
+            output.write(json.dumps(record) + '\n')
+            count += 1
+        return count
+
+    count = 0
+    for reply in stream_responses((line.rstrip('\n') for line in source), processes, chunk_size, seed):
+        output.write(reply + '\n')
+        count += 1
+    return count
+
+
+def main():
+    def flag_value(name, default):
+        if name in sys.argv:
+            return type(default)(sys.argv[sys.argv.index(name) + 1])
+        return default
+
+    flags_with_values = {'--output', '--processes', '--chunk', '--seed'}
+    paths = [arg for i, arg in enumerate(sys.argv[1:], 1)
+             if not arg.startswith('--') and sys.argv[i - 1] not in flags_with_values]
+    path = paths[0] if paths else None
+
+    output_path = flag_value('--output', '')
+    processes = flag_value('--processes', 1)
+    chunk_size = flag_value('--chunk', 1000)
+    seed = int(sys.argv[sys.argv.index('--seed') + 1]) if '--seed' in sys.argv else None
+    jsonl = '--jsonl' in sys.argv or (path or '').endswith('.jsonl')
+
+    source = open(path, encoding='utf-8') if path else sys.stdin
+    output = open(output_path, 'w', encoding='utf-8') if output_path else sys.stdout
+    start = time.perf_counter()
+    try:
+        count = replay(source, output, jsonl, processes, chunk_size, seed)
+    finally:
+        if path:
+            source.close()
+        if output_path:
+            output.close()
+    seconds = time.perf_counter() - start
+
+    rate = count / seconds if seconds else float('inf')
+    print(f"Replayed {count} messages in {seconds:.2f} s ({rate:.0f} messages/sec, "
+          f"{processes} process{'es' if processes > 1 else ''})", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,265 @@
+"""
+Image Captioning Throughput Benchmark
+Compares captioning images one at a time (generate_caption) with batched
+captioning (generate_captions) in images per second
+
+Images are the given files, or random synthetic images with --synthetic N
+(enough to time the models without a dataset). The batched captions are
+also compared with the one-at-a-time ones, as batching should not change
+what the model says.
+
+With --startup it instead measures startup: importing the module and
+constructing an ImageCaptioner, in a fresh process (cold) and a second time
+in the same process (warm, from the model registry). With --cache-dir the
+cold start is run twice: filling the safetensors cache, then loading from it.
+
+With --reuse it times the follow-up pattern of the demo and UI (a caption,
+then alternative captions and prompts for the same image) with the feature
+cache off and on, so follow-ups skip the vision encoder.
+
+With --precisions it compares precision modes (fp32, bf16, int8-dynamic)
+for latency and accuracy on the given images or image directories. Accuracy
+is how closely captions match the fp32 ones (exact matches and word-overlap
+F1), and with --references FILE also reference captions, given as JSONL
+lines with "path" and "caption" (the format caption_pipeline.py writes).
+Use real photos for this: captions of random noise say little.
+
+IMAGE arguments may also be directories of images. --precision runs the
+other modes at one precision.
+
+Usage: python benchmark.py [IMAGE ...] [--synthetic N] [--model blip|vit-gpt2]
+                           [--batch-sizes 1,4,8] [--max-length N] [--beams N]
+                           [--precision fp32|bf16|int8-dynamic]
+       python benchmark.py --startup [--model blip|vit-gpt2] [--cache-dir DIR]
+       python benchmark.py --reuse [IMAGE ...] [--synthetic N] [--model blip|vit-gpt2]
+       python benchmark.py --precisions fp32,bf16,int8-dynamic [IMAGE ...] [--references FILE]
+"""
+
+import json
+import os
+import subprocess
+import sys
+import time
+from collections import Counter
+
+import numpy as np
+from PIL import Image
+
+from caption_pipeline import walk_directory
+from image_captioning import ImageCaptioner, feature_cache
+
+PROMPTS = ['a picture of', 'in this photo there is', 'the main subject is']
+
+FLAGS_WITH_VALUES = ['--synthetic', '--model', '--batch-sizes', '--max-length', '--beams', '--cache-dir',
+                     '--precision', '--precisions', '--references']
+
+# Run in a fresh interpreter so nothing is imported or loaded yet
+STARTUP_SCRIPT = """
+import json, sys, time
+sys.path.insert(0, sys.argv[3])
+start = time.perf_counter()
+import image_captioning
+imported = time.perf_counter()
+image_captioning.ImageCaptioner(sys.argv[1], sys.argv[2] or None)
+cold = time.perf_counter()
+image_captioning.ImageCaptioner(sys.argv[1], sys.argv[2] or None)
+warm = time.perf_counter()
+print(json.dumps([imported - start, cold - imported, warm - cold]))
+"""
+
+
+def synthetic_images(count, size=384, seed=0):
+    """Random RGB images, the same ones for the same seed"""
+    rng = np.random.default_rng(seed)
+    return [Image.fromarray(rng.integers(0, 256, (size, size, 3), dtype=np.uint8)) for _ in range(count)]
+
+
+def time_one_at_a_time(captioner, images, max_length, num_beams):
+    """Caption images with one generate() call each; returns (captions, seconds)"""
+    start = time.perf_counter()
+    captions = [captioner.generate_caption(image, max_length, num_beams) for image in images]
+    return captions, time.perf_counter() - start
+
+
+def time_batched(captioner, images, batch_size, max_length, num_beams):
+    """Caption images batch_size at a time; returns (captions, seconds)"""
+    start = time.perf_counter()
+    captions = captioner.generate_captions(images, batch_size, max_length, num_beams)
+    return captions, time.perf_counter() - start
+
+
+def time_follow_ups(captioner, images, max_length, num_beams):
+    """A caption, 3 alternatives and (BLIP only) the prompts per image; returns (captions, seconds)"""
+    start = time.perf_counter()
+    captions = []
+    for image in images:
+        captions.append(captioner.generate_caption(image, max_length, num_beams))
+        captions += captioner.generate_multiple_captions(image, num_captions=3)
+        if captioner.model_type == 'blip':
+            captions += [captioner.conditional_caption(image, prompt) for prompt in PROMPTS]
+    return captions, time.perf_counter() - start
+
+
+def print_reuse_report(captioner, images, max_length, num_beams):
+    calls = 2 + (len(PROMPTS) if captioner.model_type == 'blip' else 0)
+    print(f"{len(images)} images, {calls} captioning calls each\n")
+    print(f"{'feature cache':<16}{'seconds':>9}{'calls/s':>10}{'hits':>7}{'same':>7}")
+
+    budget = feature_cache.max_bytes
+    baseline = None
+    for label, max_bytes in [('off', 0), ('on', budget)]:
+        feature_cache.clear()
+        feature_cache.max_bytes = max_bytes
+        hits = feature_cache.hits
+        captions, seconds = time_follow_ups(captioner, images, max_length, num_beams)
+        baseline = baseline or captions
+        same = sum(caption == expected for caption, expected in zip(captions, baseline))
+        print(f"{label:<16}{seconds:>9.2f}{calls * len(images) / seconds:>10.2f}{feature_cache.hits - hits:>7}{same:>7}")
+    feature_cache.max_bytes = budget
+
+
+def word_f1(caption, reference):
+    """Word-overlap F1 of two captions: 1.0 for the same words, 0.0 for none in common"""
+    words, reference_words = Counter(caption.lower().split()), Counter(reference.lower().split())
+    common = sum((words & reference_words).values())
+    if not common:
+        return float(words == reference_words)
+    of_caption = common / sum(words.values())
+    of_reference = common / sum(reference_words.values())
+    return 2 * of_caption * of_reference / (of_caption + of_reference)
+
+
+def read_references(path):
+    """Reference captions from a JSONL file, keyed by absolute image path"""
+    references = {}
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                if 'caption' in record:
+                    references[os.path.abspath(record['path'])] = record['caption']
+    return references
+
+
+def print_precision_report(args, images, paths):
+    references = read_references(args['references']) if args['references'] else {}
+    expected = [references.get(os.path.abspath(path)) for path in paths]
+    scored = [index for index, reference in enumerate(expected) if reference is not None]
+    if args['references']:
+        print(f"{len(scored)} of {len(images)} images have a reference caption")
+
+    print(f"{len(images)} images, max_length={args['max_length']}, num_beams={args['beams']}\n")
+    header = f"{'precision':<14}{'ms/image':>10}{'speedup':>9}{'same':>7}{'F1 vs fp32':>12}"
+    print(header + (f"{'F1 vs refs':>12}" if scored else ''))
+
+    baseline = baseline_seconds = None
+    for precision in args['precisions']:
+        captioner = ImageCaptioner(args['model'], args['cache_dir'] or None, precision)
+        captioner.generate_caption(images[0], args['max_length'], args['beams'])
+        feature_cache.clear()
+
+        captions, seconds = time_one_at_a_time(captioner, images, args['max_length'], args['beams'])
+        # Accuracy is relative to the first precision run (fp32 unless left out)
+        if baseline is None:
+            baseline, baseline_seconds = captions, seconds
+        same = sum(caption == expected for caption, expected in zip(captions, baseline))
+        f1 = sum(map(word_f1, captions, baseline)) / len(images)
+
+        row = f"{precision:<14}{seconds / len(images) * 1000:>10.1f}{baseline_seconds / seconds:>8.1f}x{same:>7}{f1:>12.3f}"
+        if scored:
+            row += f"{sum(word_f1(captions[i], expected[i]) for i in scored) / len(scored):>12.3f}"
+        print(row)
+
+
+def time_startup(model_type, cache_dir=None):
+    """Startup of a new process: (import, cold load, warm load) seconds"""
+    result = subprocess.run(
+        [sys.executable, '-c', STARTUP_SCRIPT, model_type, cache_dir or '', os.path.dirname(os.path.abspath(__file__))],
+        capture_output=True, text=True, check=True
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def print_startup_report(model_type, cache_dir=None):
+    runs = [('hub checkpoint', None)]
+    if cache_dir:
+        runs += [('filling cache', cache_dir), ('from cache', cache_dir)]
+
+    print(f"Startup of {model_type.upper()} in a new process\n")
+    print(f"{'weights':<18}{'import s':>10}{'cold load s':>13}{'warm load s':>13}")
+    for label, directory in runs:
+        imported, cold, warm = time_startup(model_type, directory)
+        print(f"{label:<18}{imported:>10.2f}{cold:>13.2f}{warm:>13.4f}")
+
+
+def parse_args(argv):
+    def flag_value(name, default):
+        if name in argv:
+            return type(default)(argv[argv.index(name) + 1])
+        return default
+
+    paths = [arg for i, arg in enumerate(argv[1:], 1)
+             if not arg.startswith('--') and argv[i - 1] not in FLAGS_WITH_VALUES]
+    return {
+        'paths': paths,
+        'synthetic': flag_value('--synthetic', 16),
+        'model': flag_value('--model', 'blip'),
+        'batch_sizes': [int(size) for size in flag_value('--batch-sizes', '1,4,8').split(',')],
+        'max_length': flag_value('--max-length', 30),
+        'beams': flag_value('--beams', 4),
+        'cache_dir': flag_value('--cache-dir', ''),
+        'startup': '--startup' in argv,
+        'reuse': '--reuse' in argv,
+        'precision': flag_value('--precision', 'fp32'),
+        'precisions': [name for name in flag_value('--precisions', '').split(',') if name],
+        'references': flag_value('--references', ''),
+    }
+
+
+def main():
+    args = parse_args(sys.argv)
+    if args['startup']:
+        print_startup_report(args['model'], args['cache_dir'])
+        return
+
+    paths = []
+    for path in args['paths']:
+        paths += list(walk_directory(path)) if os.path.isdir(path) else [path]
+    if paths:
+        images = [Image.open(path).convert('RGB') for path in paths]
+    else:
+        images = synthetic_images(args['synthetic'])
+        paths = [f'synthetic-{number}' for number in range(len(images))]
+
+    if args['precisions']:
+        print_precision_report(args, images, paths)
+        return
+
+    print(f"Loading {args['model'].upper()} model ({args['precision']})...")
+    captioner = ImageCaptioner(args['model'], args['cache_dir'] or None, args['precision'])
+
+    # Warm up once so one-time setup isn't counted against the first method,
+    # then drop its cached features so the first image isn't a free hit
+    captioner.generate_caption(images[0], args['max_length'], args['beams'])
+    feature_cache.clear()
+
+    if args['reuse']:
+        print_reuse_report(captioner, images, args['max_length'], args['beams'])
+        return
+
+    print(f"{len(images)} images, max_length={args['max_length']}, num_beams={args['beams']}\n")
+    print(f"{'method':<22}{'seconds':>9}{'images/s':>10}{'speedup':>9}{'same':>7}")
+
+    baseline, seconds = time_one_at_a_time(captioner, images, args['max_length'], args['beams'])
+    baseline_rate = len(images) / seconds
+    print(f"{'one at a time':<22}{seconds:>9.2f}{baseline_rate:>10.2f}{1:>8.1f}x{len(images):>7}")
+
+    for batch_size in args['batch_sizes']:
+        captions, seconds = time_batched(captioner, images, batch_size, args['max_length'], args['beams'])
+        rate = len(images) / seconds
+        same = sum(caption == expected for caption, expected in zip(captions, baseline))
+        print(f"{f'batches of {batch_size}':<22}{seconds:>9.2f}{rate:>10.2f}{rate / baseline_rate:>8.1f}x{same:>7}")
+
+
+if __name__ == "__main__":
+    main()
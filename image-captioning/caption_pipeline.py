@@ -0,0 +1,347 @@
+"""
+Streaming Captioning Pipeline
+Captions a whole folder (or a manifest of image paths) with one loaded model
+
+    paths --> [decode threads] --> ready queue --> [model, in batches] --> JSONL
+
+Images are opened, decoded and resized by a pool of threads (PIL releases
+the GIL while it decodes), so the next batch is ready while the model
+captions the current one. Both queues are bounded, so memory stays flat no
+matter how many images there are. JPEGs are decoded straight at a reduced
+scale when the model input is much smaller than the photo.
+
+Each caption is appended to the output as one JSON line as soon as its
+batch finishes. Running the same command again skips every image already
+captioned in the output, so an interrupted run picks up where it stopped
+and images that failed before are tried again.
+
+Usage: python caption_pipeline.py SOURCE [--output captions.jsonl] [--model blip]
+                                  [--batch-size 8] [--workers 4] [--prefetch 32]
+                                  [--max-length 50] [--beams 4] [--no-resume]
+                                  [--cache-dir DIR] [--precision fp32|bf16|int8-dynamic]
+
+SOURCE is a directory (searched recursively) or a manifest: a text file
+with one image path per line, or a JSONL file with a "path" per line.
+Relative manifest paths are relative to the manifest. --cache-dir keeps a
+fast-loading safetensors copy of the model weights (see image_captioning).
+"""
+
+import json
+import os
+import queue
+import sys
+import threading
+import time
+
+from PIL import Image
+
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.bmp', '.gif', '.webp', '.tif', '.tiff'}
+FLAGS_WITH_VALUES = ['--output', '--model', '--batch-size', '--workers', '--prefetch', '--max-length', '--beams',
+                     '--cache-dir', '--precision']
+
+DONE = object()  # End-of-work marker passed along the queues
+
+
+# ===== INPUT =====
+
+def walk_directory(directory):
+    """Image files under a directory, in a stable (sorted) order"""
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
+        for name in sorted(files):
+            if os.path.splitext(name)[1].lower() in IMAGE_EXTENSIONS:
+                yield os.path.join(root, name)
+
+
+def read_manifest(manifest):
+    """Image paths listed in a manifest (plain text or JSONL with a "path" field)"""
+    base = os.path.dirname(os.path.abspath(manifest))
+    with open(manifest, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            path = json.loads(line)['path'] if line.startswith('{') else line
+            yield os.path.join(base, path)
+
+
+def image_paths(source):
+    """Image paths from a directory or a manifest"""
+    if os.path.isdir(source):
+        return walk_directory(source)
+    return read_manifest(source)
+
+
+def load_checkpoint(output):
+    """
+    Paths already captioned in the output file, so a restarted run can skip
+    them; "error" records don't count, so those images are tried again.
+    A line cut short by a crash is dropped from the end of the file first.
+    """
+    done = set()
+    if not os.path.exists(output):
+        return done
+
+    with open(output, 'rb+') as f:
+        data = f.read()
+        complete = data.rfind(b'\n') + 1
+        if complete < len(data):
+            f.truncate(complete)
+
+    for line in data[:complete].decode('utf-8').splitlines():
+        try:
+            record = json.loads(line)
+            if 'caption' in record:
+                done.add(record['path'])
+        except (ValueError, KeyError, TypeError):
+            continue
+    return done
+
+
+# ===== DECODING =====
+
+def image_processor(captioner):
+    """The captioner's image processor, or None if it has none"""
+    processor = getattr(captioner, 'feature_extractor', None)
+    if processor is None:
+        processor = getattr(getattr(captioner, 'processor', None), 'image_processor', None)
+    return processor
+
+
+def input_size(processor):
+    """(width, height) the processor resizes images to, or None if unknown"""
+    size = getattr(processor, 'size', None)
+    if not size or 'height' not in size:
+        return None
+    return size['width'], size['height']
+
+
+def resample_filter(processor):
+    """PIL resampling filter the processor resizes with (bicubic if unknown)"""
+    resample = getattr(processor, 'resample', None)
+    return Image.BICUBIC if resample is None else int(resample)
+
+
+def decode_image(path, size=None, resample=Image.BICUBIC):
+    """
+    Open an image as RGB, already resized to the model input size if given
+    Resizing with the processor's own filter keeps the pixels it then sees
+    the same as when it resizes the full image itself.
+    """
+    image = Image.open(path)
+    if size is not None:
+        # JPEG can decode at 1/2, 1/4 or 1/8 scale for almost free
+        image.draft('RGB', size)
+    image = image.convert('RGB')
+    if size is not None and image.size != size:
+        image = image.resize(size, resample)
+    return image
+
+
+class StageTimer:
+    """Busy time of one pipeline stage, shared by its threads"""
+
+    def __init__(self, name, threads=1):
+        self.name = name
+        self.threads = threads
+        self.busy = 0.0
+        self.items = 0
+        self.lock = threading.Lock()
+
+    def add(self, seconds, items=1):
+        with self.lock:
+            self.busy += seconds
+            self.items += items
+
+    def utilization(self, wall):
+        """Fraction of the run its threads spent working"""
+        return self.busy / (wall * self.threads) if wall else 0.0
+
+
+# ===== PIPELINE =====
+
+class CaptionPipeline:
+    def __init__(self, captioner, batch_size=8, workers=4, prefetch=32, max_length=50, num_beams=4):
+        """Settings for captioning many images with one captioner"""
+        self.captioner = captioner
+        self.batch_size = batch_size
+        self.workers = workers
+        self.prefetch = prefetch
+        self.max_length = max_length
+        self.num_beams = num_beams
+        processor = image_processor(captioner)
+        self.size = input_size(processor)
+        self.resample = resample_filter(processor)
+
+    def _feed(self, paths, todo):
+        """Put every path on the work queue, then one DONE per decode thread"""
+        for path in paths:
+            todo.put(path)
+        for _ in range(self.workers):
+            todo.put(DONE)
+
+    def _decode(self, todo, ready, timer):
+        """Decode-thread loop: path -> (path, image or None, error or None)"""
+        while True:
+            path = todo.get()
+            if path is DONE:
+                ready.put(DONE)
+                return
+            start = time.perf_counter()
+            try:
+                item = (path, decode_image(path, self.size, self.resample), None)
+            except Exception as e:
+                item = (path, None, f"{type(e).__name__}: {e}")
+            timer.add(time.perf_counter() - start)
+            ready.put(item)
+
+    def _batches(self, ready, wait_timer):
+        """Group decoded images into batches until every decode thread is done"""
+        batch = []
+        finished = 0
+        while finished < self.workers:
+            start = time.perf_counter()
+            item = ready.get()
+            wait_timer.add(time.perf_counter() - start, 0)
+            if item is DONE:
+                finished += 1
+                continue
+            batch.append(item)
+            if len(batch) == self.batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def run(self, paths, output, resume=True, progress_every=10):
+        """
+        Caption every path, appending {"path", "caption"} (or {"path", "error"})
+        lines to output; returns a stats dict
+        """
+        done = load_checkpoint(output) if resume else set()
+        skipped = 0
+        pending = []
+        for path in paths:
+            if path in done:
+                skipped += 1
+            else:
+                pending.append(path)
+
+        decode_timer = StageTimer('decode', self.workers)
+        model_timer = StageTimer('model')
+        write_timer = StageTimer('write')
+        wait_timer = StageTimer('waiting for images')
+
+        # Bounded: the feeder and decoders block instead of running ahead
+        todo = queue.Queue(maxsize=self.prefetch)
+        ready = queue.Queue(maxsize=self.prefetch)
+        threads = [threading.Thread(target=self._feed, args=(pending, todo), daemon=True)]
+        threads += [threading.Thread(target=self._decode, args=(todo, ready, decode_timer), daemon=True)
+                    for _ in range(self.workers)]
+
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+
+        captioned = failed = 0
+        with open(output, 'a' if resume else 'w', encoding='utf-8') as out:
+            for number, batch in enumerate(self._batches(ready, wait_timer), 1):
+                records = [{'path': path, 'error': error} for path, image, error in batch if image is None]
+                decoded = [(path, image) for path, image, error in batch if image is not None]
+
+                if decoded:
+                    start = time.perf_counter()
+                    captions = self.captioner.generate_captions(
+                        [image for _, image in decoded], self.batch_size, self.max_length, self.num_beams
+                    )
+                    model_timer.add(time.perf_counter() - start, len(decoded))
+                    records += [{'path': path, 'caption': caption} for (path, _), caption in zip(decoded, captions)]
+
+                start = time.perf_counter()
+                for record in records:
+                    out.write(json.dumps(record, ensure_ascii=False) + '\n')
+                out.flush()
+                write_timer.add(time.perf_counter() - start, len(records))
+
+                captioned += len(decoded)
+                failed += len(batch) - len(decoded)
+                if progress_every and number % progress_every == 0:
+                    elapsed = time.perf_counter() - started
+                    print(f"  {captioned + failed}/{len(pending)} images, {captioned / elapsed:.2f} images/s")
+
+        for thread in threads:
+            thread.join()
+        wall = time.perf_counter() - started
+
+        return {
+            'captioned': captioned,
+            'failed': failed,
+            'skipped': skipped,
+            'seconds': wall,
+            'images_per_second': captioned / wall if wall else 0.0,
+            'stages': {
+                timer.name: {'busy_s': timer.busy, 'utilization': timer.utilization(wall)}
+                for timer in [decode_timer, model_timer, write_timer, wait_timer]
+            },
+        }
+
+
+def print_stats(stats):
+    print(f"\nCaptioned {stats['captioned']} images in {stats['seconds']:.1f}s "
+          f"({stats['images_per_second']:.2f} images/s)")
+    print(f"Failed: {stats['failed']}, already done: {stats['skipped']}")
+    print(f"\n{'stage':<20}{'busy s':>9}{'utilization':>13}")
+    for name, stage in stats['stages'].items():
+        print(f"{name:<20}{stage['busy_s']:>9.2f}{stage['utilization']:>12.0%}")
+
+
+def parse_args(argv):
+    def flag_value(name, default):
+        if name in argv:
+            return type(default)(argv[argv.index(name) + 1])
+        return default
+
+    sources = [arg for i, arg in enumerate(argv[1:], 1)
+               if not arg.startswith('--') and argv[i - 1] not in FLAGS_WITH_VALUES]
+    return {
+        'source': sources[0] if sources else None,
+        'output': flag_value('--output', 'captions.jsonl'),
+        'model': flag_value('--model', 'blip'),
+        'batch_size': flag_value('--batch-size', 8),
+        'workers': flag_value('--workers', 4),
+        'prefetch': flag_value('--prefetch', 32),
+        'max_length': flag_value('--max-length', 50),
+        'beams': flag_value('--beams', 4),
+        'resume': '--no-resume' not in argv,
+        'cache_dir': flag_value('--cache-dir', ''),
+        'precision': flag_value('--precision', 'fp32'),
+    }
+
+
+def main():
+    args = parse_args(sys.argv)
+    if args['source'] is None:
+        print("Usage: python caption_pipeline.py SOURCE [--output captions.jsonl] [--model blip] "
+              "[--batch-size 8] [--workers 4] [--prefetch 32] [--max-length 50] [--beams 4] [--no-resume] [--cache-dir DIR] "
+              "[--precision fp32|bf16|int8-dynamic]")
+        print("SOURCE: an image directory, or a manifest (.txt paths or .jsonl with \"path\")")
+        sys.exit(1)
+    if not os.path.exists(args['source']):
+        print(f"Error: Not found: {args['source']}")
+        sys.exit(1)
+
+    # Imported late, as torch and transformers take seconds to load
+    from image_captioning import ImageCaptioner
+
+    print(f"Loading {args['model'].upper()} model ({args['precision']})...")
+    captioner = ImageCaptioner(args['model'], args['cache_dir'] or None, args['precision'])
+    pipeline = CaptionPipeline(captioner, args['batch_size'], args['workers'], args['prefetch'],
+                               args['max_length'], args['beams'])
+
+    print(f"Captioning {args['source']} -> {args['output']}")
+    stats = pipeline.run(image_paths(args['source']), args['output'], resume=args['resume'])
+    print_stats(stats)
+
+
+if __name__ == "__main__":
+    main()
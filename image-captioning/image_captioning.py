@@ -1,18 +1,35 @@
 import torch
 import torch.nn as nn
-from torchvision import models, transforms
 from PIL import Image
-from transformers import BlipProcessor, BlipForConditionalGeneration
-from transformers import VisionEncoderDecoderModel, ViTImageProcessor, AutoTokenizer
-from transformers import GPT2Tokenizer, GPT2LMHeadModel
+from collections import OrderedDict
+from contextlib import nullcontext
+from functools import partial, wraps
+import hashlib
+import shutil
+import threading
 import warnings
 import os
 warnings.filterwarnings('ignore')
 
+# torchvision and transformers are imported by the backend that needs them,
+# so importing this module (or using one backend) doesn't pay for all of them
+
+BLIP_MODEL = "Salesforce/blip-image-captioning-base"
+VIT_GPT2_MODEL = "nlpconnect/vit-gpt2-image-captioning"
+GPT2_MODEL = "gpt2"
+
+# fp32: as loaded; bf16: autocast to bfloat16 while running (same weights);
+# int8-dynamic: linear layers quantized to int8 (CPU only)
+PRECISIONS = ('fp32', 'bf16', 'int8-dynamic')
+
+# Byte budget of the shared cache of pixel tensors and vision-encoder outputs
+FEATURE_CACHE_BYTES = 512 * 1024 * 1024
+
 
 class ResNetFeatureExtractor(nn.Module):
     def __init__(self):
         super(ResNetFeatureExtractor, self).__init__()
+        from torchvision import models
         resnet = models.resnet50(pretrained=True)
         self.features = nn.Sequential(*list(resnet.children())[:-1])
         self.features.eval()
@@ -27,6 +44,7 @@ class ResNetFeatureExtractor(nn.Module):
 class VGGFeatureExtractor(nn.Module):
     def __init__(self):
         super(VGGFeatureExtractor, self).__init__()
+        from torchvision import models
         vgg = models.vgg16(pretrained=True)
         self.features = vgg.features
         self.avgpool = vgg.avgpool
@@ -59,61 +77,316 @@ class RNNDecoder(nn.Module):
         return outputs
 
 
+def load_image(image):
+    # Accept a file path or an already opened PIL image
+    if isinstance(image, Image.Image):
+        return image.convert('RGB')
+    return Image.open(image).convert('RGB')
+
+
+def image_digest(image):
+    # Content hash of an image file (or of an opened PIL image's pixels), so
+    # the same picture hits the feature cache under any path or file name
+    digest = hashlib.blake2b(digest_size=16)
+    if isinstance(image, Image.Image):
+        digest.update(f"{image.mode} {image.size}".encode())
+        digest.update(image.tobytes())
+    else:
+        with open(image, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+
+def tensor_bytes(tensor):
+    return tensor.numel() * tensor.element_size()
+
+
+class FeatureCache:
+    # LRU cache of per-image tensors, evicting the least recently used ones
+    # once their total size is over max_bytes. Thread-safe.
+    def __init__(self, max_bytes=FEATURE_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+    
+    def get(self, key):
+        with self.lock:
+            tensor = self.entries.get(key)
+            if tensor is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return tensor
+    
+    def put(self, key, tensor):
+        size = tensor_bytes(tensor)
+        with self.lock:
+            if size > self.max_bytes:
+                return
+            previous = self.entries.pop(key, None)
+            if previous is not None:
+                self.bytes -= tensor_bytes(previous)
+            self.entries[key] = tensor
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                _, evicted = self.entries.popitem(last=False)
+                self.bytes -= tensor_bytes(evicted)
+                self.evictions += 1
+    
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.bytes = 0
+    
+    def stats(self):
+        with self.lock:
+            return {
+                'entries': len(self.entries),
+                'bytes': self.bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
+
+
+# Shared by every ImageCaptioner; entries are keyed by model type and device
+# as well (int8-dynamic captioners run on the CPU even when CUDA is there)
+feature_cache = FeatureCache()
+
+
+def pretrained(cls, name, cache_dir=None):
+    # cls.from_pretrained(name), through an optional local cache: the first
+    # load saves a safetensors copy to cache_dir, later loads memory-map it
+    # (much faster than unpickling a pytorch_model.bin checkpoint)
+    if cache_dir is None:
+        return cls.from_pretrained(name)
+    
+    local = os.path.join(cache_dir, name.replace('/', '--'), cls.__name__)
+    if os.path.isdir(local):
+        return cls.from_pretrained(local)
+    
+    loaded = cls.from_pretrained(name)
+    staging = f"{local}.tmp{os.getpid()}"
+    loaded.save_pretrained(staging)
+    try:
+        os.replace(staging, local)
+    except OSError:
+        # Another process saved it first
+        shutil.rmtree(staging, ignore_errors=True)
+    return loaded
+
+
+def load_blip(device, cache_dir):
+    from transformers import BlipProcessor, BlipForConditionalGeneration
+    
+    model = pretrained(BlipForConditionalGeneration, BLIP_MODEL, cache_dir)
+    return {
+        'processor': pretrained(BlipProcessor, BLIP_MODEL, cache_dir),
+        'model': model.to(device).eval(),
+    }
+
+
+def load_vit_gpt2(device, cache_dir):
+    from transformers import VisionEncoderDecoderModel, ViTImageProcessor, AutoTokenizer
+    
+    model = pretrained(VisionEncoderDecoderModel, VIT_GPT2_MODEL, cache_dir)
+    return {
+        'model': model.to(device).eval(),
+        'feature_extractor': pretrained(ViTImageProcessor, VIT_GPT2_MODEL, cache_dir),
+        'tokenizer': pretrained(AutoTokenizer, VIT_GPT2_MODEL, cache_dir),
+    }
+
+
+def load_cnn_rnn(encoder_class, device, cache_dir):
+    from torchvision import transforms
+    from transformers import GPT2Tokenizer, GPT2LMHeadModel
+    
+    decoder = pretrained(GPT2LMHeadModel, GPT2_MODEL, cache_dir)
+    return {
+        'encoder': encoder_class().to(device),
+        'transform': transforms.Compose([
+            transforms.Resize((224, 224)),
+            transforms.ToTensor(),
+            transforms.Normalize(mean=[0.485, 0.456, 0.406], std=[0.229, 0.224, 0.225])
+        ]),
+        'tokenizer': pretrained(GPT2Tokenizer, GPT2_MODEL, cache_dir),
+        'decoder': decoder.to(device).eval(),
+    }
+
+
+def conv1d_to_linear(module):
+    # GPT-2 layers are transformers' Conv1D (a Linear with a transposed
+    # weight), which dynamic quantization skips; swap in equivalent Linears
+    from transformers.pytorch_utils import Conv1D
+    
+    for name, child in module.named_children():
+        if isinstance(child, Conv1D):
+            linear = nn.Linear(child.weight.shape[0], child.nf, device=child.weight.device)
+            linear.weight.data = child.weight.data.t().contiguous()
+            linear.bias.data = child.bias.data
+            setattr(module, name, linear)
+        else:
+            conv1d_to_linear(child)
+    return module
+
+
+def quantize_int8(components):
+    # Quantize the linear layers of every model in a backend, in place:
+    # int8 weights, activations quantized on the fly
+    from torch.ao.quantization import quantize_dynamic
+    
+    for name in ['model', 'encoder', 'decoder']:
+        if name in components:
+            components[name] = quantize_dynamic(conv1d_to_linear(components[name]), {nn.Linear},
+                                                dtype=torch.qint8, inplace=True)
+    return components
+
+
+BACKENDS = {
+    'blip': load_blip,
+    'vit-gpt2': load_vit_gpt2,
+    'resnet-rnn': partial(load_cnn_rnn, ResNetFeatureExtractor),
+    'vgg-rnn': partial(load_cnn_rnn, VGGFeatureExtractor),
+}
+
+# Process-wide registry: each backend is loaded once per device and precision
+# and shared by every ImageCaptioner using it (the models are only used for
+# inference)
+_models = {}
+_models_lock = threading.Lock()
+
+
+def load_model(model_type, device, cache_dir=None, precision='fp32'):
+    if model_type not in BACKENDS:
+        raise ValueError(f"Unknown model type: {model_type} (choose from {', '.join(BACKENDS)})")
+    if precision not in PRECISIONS:
+        raise ValueError(f"Unknown precision: {precision} (choose from {', '.join(PRECISIONS)})")
+    
+    key = (model_type, str(device), precision)
+    with _models_lock:
+        if key not in _models:
+            if precision == 'int8-dynamic':
+                # Quantizes a copy of its own, as the fp32 one may be in use
+                _models[key] = quantize_int8(BACKENDS[model_type](device, cache_dir))
+            else:
+                # bf16 only changes how the fp32 weights are run, so it shares them
+                fp32_key = (model_type, str(device), 'fp32')
+                if fp32_key not in _models:
+                    _models[fp32_key] = BACKENDS[model_type](device, cache_dir)
+                _models[key] = _models[fp32_key]
+        return _models[key]
+
+
+def clear_models():
+    # Drop every loaded backend, e.g. to free memory
+    with _models_lock:
+        _models.clear()
+
+
+def with_precision(method):
+    # Run a captioning method under the captioner's precision (bf16 autocast)
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.precision_context():
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
 class ImageCaptioner:
-    def __init__(self, model_type='blip'):
-        self.device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
+    def __init__(self, model_type='blip', cache_dir=None, precision='fp32'):
+        # Quantized int8 kernels only exist for the CPU
+        use_cuda = torch.cuda.is_available() and precision != 'int8-dynamic'
+        self.device = torch.device('cuda' if use_cuda else 'cpu')
         self.model_type = model_type
+        self.precision = precision
         
-        if model_type == 'blip':
-            self.processor = BlipProcessor.from_pretrained("Salesforce/blip-image-captioning-base")
-            self.model = BlipForConditionalGeneration.from_pretrained("Salesforce/blip-image-captioning-base")
-            self.model.to(self.device)
-            self.model.eval()
-            
-        elif model_type == 'vit-gpt2':
-            self.model = VisionEncoderDecoderModel.from_pretrained("nlpconnect/vit-gpt2-image-captioning")
-            self.feature_extractor = ViTImageProcessor.from_pretrained("nlpconnect/vit-gpt2-image-captioning")
-            self.tokenizer = AutoTokenizer.from_pretrained("nlpconnect/vit-gpt2-image-captioning")
-            self.model.to(self.device)
-            self.model.eval()
-            
-        elif model_type == 'resnet-rnn':
-            self.encoder = ResNetFeatureExtractor().to(self.device)
-            self.transform = transforms.Compose([
-                transforms.Resize((224, 224)),
-                transforms.ToTensor(),
-                transforms.Normalize(mean=[0.485, 0.456, 0.406], std=[0.229, 0.224, 0.225])
-            ])
-            self.tokenizer = GPT2Tokenizer.from_pretrained('gpt2')
-            self.decoder = GPT2LMHeadModel.from_pretrained('gpt2').to(self.device)
-            self.decoder.eval()
-            
-        elif model_type == 'vgg-rnn':
-            self.encoder = VGGFeatureExtractor().to(self.device)
-            self.transform = transforms.Compose([
-                transforms.Resize((224, 224)),
-                transforms.ToTensor(),
-                transforms.Normalize(mean=[0.485, 0.456, 0.406], std=[0.229, 0.224, 0.225])
-            ])
-            self.tokenizer = GPT2Tokenizer.from_pretrained('gpt2')
-            self.decoder = GPT2LMHeadModel.from_pretrained('gpt2').to(self.device)
-            self.decoder.eval()
+        for name, component in load_model(model_type, self.device, cache_dir, precision).items():
+            setattr(self, name, component)
     
-    def generate_caption(self, image_path, max_length=50, num_beams=4):
-        image = Image.open(image_path).convert('RGB')
+    def precision_context(self):
+        if self.precision == 'bf16':
+            return torch.autocast(self.device.type, dtype=torch.bfloat16)
+        return nullcontext()
+    
+    def pixel_values(self, image, digest=None):
+        # Preprocessed pixel tensor of one image, from the feature cache when
+        # the same image was preprocessed before
+        key = (digest or image_digest(image), 'pixels', self.model_type, str(self.device))
+        pixel_values = feature_cache.get(key)
+        if pixel_values is None:
+            processor = self.processor if self.model_type == 'blip' else self.feature_extractor
+            pixel_values = processor(images=load_image(image), return_tensors="pt").pixel_values.to(self.device)
+            feature_cache.put(key, pixel_values)
+        return pixel_values
+    
+    @with_precision
+    def encode_image(self, image):
+        # Vision-encoder output for one image (BLIP and ViT-GPT2), from the
+        # feature cache when the same image was encoded before, so follow-up
+        # captions and prompts only run the text decoder
+        digest = image_digest(image)
+        key = (digest, 'encoded', self.model_type, str(self.device), self.precision)
+        encoded = feature_cache.get(key)
+        if encoded is None:
+            pixel_values = self.pixel_values(image, digest)
+            with torch.no_grad():
+                if self.model_type == 'blip':
+                    encoded = self.model.vision_model(pixel_values=pixel_values)[0]
+                else:
+                    encoded = self.model.encoder(pixel_values=pixel_values).last_hidden_state
+            feature_cache.put(key, encoded)
+        return encoded
+    
+    def _blip_generate(self, image_embeds, input_ids=None, attention_mask=None, **generate_kwargs):
+        # BlipForConditionalGeneration.generate() without the vision encoder:
+        # runs the text decoder on already computed image embeddings
+        config = self.model.config.text_config
+        if input_ids is None:
+            input_ids = torch.tensor([[config.bos_token_id, config.eos_token_id]], device=self.device)
+            input_ids = input_ids.repeat(image_embeds.shape[0], 1)
+        else:
+            input_ids = input_ids.clone()
+        input_ids[:, 0] = config.bos_token_id
+        
+        image_attention_mask = torch.ones(image_embeds.shape[:-1], dtype=torch.long, device=image_embeds.device)
+        return self.model.text_decoder.generate(
+            input_ids=input_ids[:, :-1],
+            eos_token_id=config.sep_token_id,
+            pad_token_id=config.pad_token_id,
+            attention_mask=attention_mask[:, :-1] if attention_mask is not None else None,
+            encoder_hidden_states=image_embeds,
+            encoder_attention_mask=image_attention_mask,
+            **generate_kwargs
+        )
+    
+    def _vit_gpt2_generate(self, encoded, **generate_kwargs):
+        from transformers.modeling_outputs import BaseModelOutput
         
+        # generate() expands encoder_outputs in place for beam search, so the
+        # cached tensor gets a fresh wrapper every time
+        return self.model.generate(encoder_outputs=BaseModelOutput(last_hidden_state=encoded), **generate_kwargs)
+    
+    @with_precision
+    def generate_caption(self, image_path, max_length=50, num_beams=4):
         if self.model_type == 'blip':
-            inputs = self.processor(image, return_tensors="pt").to(self.device)
-            outputs = self.model.generate(**inputs, max_length=max_length, num_beams=num_beams, early_stopping=True)
+            image_embeds = self.encode_image(image_path)
+            outputs = self._blip_generate(image_embeds, max_length=max_length, num_beams=num_beams, early_stopping=True)
             caption = self.processor.decode(outputs[0], skip_special_tokens=True)
             
         elif self.model_type == 'vit-gpt2':
-            pixel_values = self.feature_extractor(images=image, return_tensors="pt").pixel_values
-            pixel_values = pixel_values.to(self.device)
-            output_ids = self.model.generate(pixel_values, max_length=max_length, num_beams=num_beams, early_stopping=True)
+            encoded = self.encode_image(image_path)
+            output_ids = self._vit_gpt2_generate(encoded, max_length=max_length, num_beams=num_beams, early_stopping=True)
             caption = self.tokenizer.decode(output_ids[0], skip_special_tokens=True)
             
         elif self.model_type in ['resnet-rnn', 'vgg-rnn']:
+            image = load_image(image_path)
             img_tensor = self.transform(image).unsqueeze(0).to(self.device)
             features = self.encoder(img_tensor)
             
@@ -133,28 +406,54 @@ class ImageCaptioner:
         
         return caption
     
+    @with_precision
+    def generate_captions(self, images, batch_size=8, max_length=50, num_beams=4):
+        # Caption many images (paths or PIL images), batch_size at a time:
+        # each batch is preprocessed into one tensor and captioned by a
+        # single generate() call, which keeps the matrix units busy
+        if self.model_type not in ['blip', 'vit-gpt2']:
+            return [self.generate_caption(image, max_length, num_beams) for image in images]
+        
+        images = list(images)
+        captions = []
+        for start in range(0, len(images), batch_size):
+            batch = [load_image(image) for image in images[start:start + batch_size]]
+            
+            if self.model_type == 'blip':
+                inputs = self.processor(images=batch, return_tensors="pt").to(self.device)
+                outputs = self.model.generate(**inputs, max_length=max_length, num_beams=num_beams, early_stopping=True)
+                captions.extend(self.processor.batch_decode(outputs, skip_special_tokens=True))
+            
+            else:
+                pixel_values = self.feature_extractor(images=batch, return_tensors="pt").pixel_values
+                pixel_values = pixel_values.to(self.device)
+                output_ids = self.model.generate(pixel_values, max_length=max_length, num_beams=num_beams, early_stopping=True)
+                captions.extend(self.tokenizer.batch_decode(output_ids, skip_special_tokens=True))
+        
+        return captions
+    
+    @with_precision
     def generate_multiple_captions(self, image_path, num_captions=3):
-        image = Image.open(image_path).convert('RGB')
         captions = []
         
         if self.model_type == 'blip':
-            inputs = self.processor(image, return_tensors="pt").to(self.device)
-            outputs = self.model.generate(**inputs, max_length=50, num_beams=num_captions, 
-                                         num_return_sequences=num_captions, early_stopping=True)
+            image_embeds = self.encode_image(image_path)
+            outputs = self._blip_generate(image_embeds, max_length=50, num_beams=num_captions, 
+                                          num_return_sequences=num_captions, early_stopping=True)
             for output in outputs:
                 caption = self.processor.decode(output, skip_special_tokens=True)
                 captions.append(caption)
         
         elif self.model_type == 'vit-gpt2':
-            pixel_values = self.feature_extractor(images=image, return_tensors="pt").pixel_values
-            pixel_values = pixel_values.to(self.device)
-            output_ids = self.model.generate(pixel_values, max_length=50, num_beams=num_captions, 
-                                            num_return_sequences=num_captions, early_stopping=True)
+            encoded = self.encode_image(image_path)
+            output_ids = self._vit_gpt2_generate(encoded, max_length=50, num_beams=num_captions, 
+                                                 num_return_sequences=num_captions, early_stopping=True)
             for output in output_ids:
                 caption = self.tokenizer.decode(output, skip_special_tokens=True)
                 captions.append(caption)
         
         elif self.model_type in ['resnet-rnn', 'vgg-rnn']:
+            image = load_image(image_path)
             img_tensor = self.transform(image).unsqueeze(0).to(self.device)
             features = self.encoder(img_tensor)
             
@@ -177,13 +476,14 @@ class ImageCaptioner:
         
         return captions
     
+    @with_precision
     def conditional_caption(self, image_path, text_prompt):
         if self.model_type != 'blip':
             return "Conditional captioning only supported with BLIP model"
         
-        image = Image.open(image_path).convert('RGB')
-        inputs = self.processor(image, text_prompt, return_tensors="pt").to(self.device)
-        outputs = self.model.generate(**inputs, max_length=50)
+        image_embeds = self.encode_image(image_path)
+        prompt = self.processor.tokenizer(text_prompt, return_tensors="pt").to(self.device)
+        outputs = self._blip_generate(image_embeds, prompt.input_ids, prompt.attention_mask, max_length=50)
         caption = self.processor.decode(outputs[0], skip_special_tokens=True)
         
         return caption
@@ -193,19 +493,21 @@ def main():
     import sys
     
     if len(sys.argv) < 2:
-        print("Usage: python image_captioning.py <image_path> [model_type]")
+        print("Usage: python image_captioning.py <image_path> [model_type] [precision]")
         print("Model types: blip, vit-gpt2, resnet-rnn, vgg-rnn")
+        print("Precisions: fp32, bf16, int8-dynamic")
         sys.exit(1)
     
     image_path = sys.argv[1]
     model_type = sys.argv[2] if len(sys.argv) > 2 else 'blip'
+    precision = sys.argv[3] if len(sys.argv) > 3 else 'fp32'
     
     if not os.path.exists(image_path):
         print(f"Error: Image not found: {image_path}")
         sys.exit(1)
     
-    print(f"Loading {model_type.upper()} model...")
-    captioner = ImageCaptioner(model_type=model_type)
+    print(f"Loading {model_type.upper()} model ({precision})...")
+    captioner = ImageCaptioner(model_type=model_type, precision=precision)
     
     print(f"Generating caption for: {image_path}")
     caption = captioner.generate_caption(image_path)
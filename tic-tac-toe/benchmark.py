@@ -0,0 +1,348 @@
+"""
+Tic-Tac-Toe Search Benchmark
+Measures the search in tic_tac_toe.py and TicTacToeGUI.minimax (run
+without a window): nodes visited, wall time and peak memory for the opening
+move, a fixed set of mid-game positions and every reachable position.
+
+Results can be saved as JSON and compared with an earlier run, so engine
+changes can be checked for regressions:
+    python benchmark.py --json before.json
+    ... change the engine ...
+    python benchmark.py --baseline before.json   (exits with 1 on a regression)
+
+--compare also solves every reachable position with the original exhaustive
+Minimax and compares it with the alpha-beta search (takes a while).
+
+Usage: python benchmark.py [--repeat N] [--json FILE] [--baseline FILE]
+                           [--tolerance FRACTION] [--compare [--limit N]]
+"""
+
+import json
+import platform
+import random
+import sys
+import time
+import tracemalloc
+
+import tic_tac_toe as engine
+
+try:
+    from tic_tac_toe_gui import TicTacToeGUI
+except ImportError:  # No tkinter: skip the GUI cases
+    TicTacToeGUI = None
+
+
+# ===== REFERENCE: ORIGINAL EXHAUSTIVE MINIMAX =====
+
+def exhaustive_minimax(board, is_maximizing, stats):
+    """
+    The original Minimax: no pruning, no table, flat +1/-1/0 scores
+    Kept here only as the baseline to measure the engine against
+    """
+    stats['nodes'] += 1
+
+    if engine.check_winner(board, 'O'):
+        return 1
+    if engine.check_winner(board, 'X'):
+        return -1
+    if ' ' not in board:
+        return 0
+
+    if is_maximizing:
+        best_score = -float('inf')
+        for move in range(9):
+            if board[move] == ' ':
+                board[move] = 'O'
+                best_score = max(best_score, exhaustive_minimax(board, False, stats))
+                board[move] = ' '
+    else:
+        best_score = float('inf')
+        for move in range(9):
+            if board[move] == ' ':
+                board[move] = 'X'
+                best_score = min(best_score, exhaustive_minimax(board, True, stats))
+                board[move] = ' '
+    return best_score
+
+
+def bits_to_board(x_bits, o_bits):
+    """Convert an (x_bits, o_bits) bitboard back into a list board"""
+    board = engine.create_board()
+    for i in range(9):
+        if x_bits & (1 << i):
+            board[i] = 'X'
+        elif o_bits & (1 << i):
+            board[i] = 'O'
+    return board
+
+
+# ===== BENCHMARKS =====
+
+def compare_searches(positions):
+    """
+    Solve each position with both searches and check they agree on the result
+    The alpha-beta search is measured twice: with the table cleared before
+    every position (pruning and ordering only) and with the table kept
+    across positions (how a long-running process behaves)
+    """
+    results = {}
+
+    stats = {'nodes': 0}
+    expected = []
+    start = time.perf_counter()
+    for x_bits, o_bits, is_maximizing in positions:
+        board = bits_to_board(x_bits, o_bits)
+        expected.append(exhaustive_minimax(board, is_maximizing, stats))
+    results['exhaustive'] = {'nodes': stats['nodes'], 'seconds': time.perf_counter() - start}
+
+    for name, cold in [('alphabeta (cold table)', True), ('alphabeta (warm table)', False)]:
+        engine.clear_transposition_table()
+        nodes = 0
+        start = time.perf_counter()
+        for (x_bits, o_bits, is_maximizing), want in zip(positions, expected):
+            if cold:
+                engine.clear_transposition_table()
+            score = engine.minimax_bits(x_bits, o_bits, is_maximizing)
+            nodes += engine.search_stats['nodes']
+            engine.reset_search_stats()
+
+            # Depth-discounted scores keep the sign of the flat score
+            if (score > 0) - (score < 0) != want:
+                raise AssertionError(f"Search mismatch on {bits_to_board(x_bits, o_bits)}")
+        results[name] = {'nodes': nodes, 'seconds': time.perf_counter() - start}
+
+    return results
+
+
+# ===== BENCHMARK SUITE =====
+
+def mid_game_positions(count=50, pieces=4):
+    """A fixed, reproducible sample of reachable positions with some pieces placed"""
+    positions = sorted(
+        position for position in engine.all_reachable_positions()
+        if engine.PIECE_COUNT[position[0] | position[1]] == pieces
+    )
+    return random.Random(0).sample(positions, min(count, len(positions)))
+
+
+def headless_gui():
+    """Create a TicTacToeGUI without opening a window, for its search methods"""
+    gui = TicTacToeGUI.__new__(TicTacToeGUI)
+    gui.size = 3
+    gui.k = 3
+    gui.classic = True
+    gui.nxn = None
+    gui.human = 'X'
+    gui.ai = 'O'
+    gui.board = engine.create_board()
+    return gui
+
+
+def suite_cases():
+    """
+    Return (name, prepare) pairs. prepare() sets up a case (for example
+    clearing the transposition table) and returns the function to measure.
+    """
+    mid_game = mid_game_positions()
+    reachable = engine.all_reachable_positions()
+
+    def opening_minimax():
+        engine.clear_transposition_table()
+        return lambda: engine.minimax(engine.create_board(), True)
+
+    def opening_search():
+        engine.clear_transposition_table()
+        return lambda: engine.search_best_move(0, 0)
+
+    def opening_book():
+        engine.get_book()
+        return lambda: engine.get_best_move(engine.create_board())
+
+    def mid_game_cold():
+        def run():
+            for x_bits, o_bits, is_maximizing in mid_game:
+                engine.transposition_table.clear()
+                engine.minimax_bits(x_bits, o_bits, is_maximizing)
+        return run
+
+    def all_positions(cold):
+        def prepare():
+            engine.clear_transposition_table()
+
+            def run():
+                for x_bits, o_bits, is_maximizing in reachable:
+                    if cold:
+                        engine.transposition_table.clear()
+                    engine.minimax_bits(x_bits, o_bits, is_maximizing)
+            return run
+        return prepare
+
+    def book_sweep():
+        engine.get_book()
+        boards = [bits_to_board(x_bits, o_bits) for x_bits, o_bits, is_maximizing in reachable if is_maximizing]
+
+        def run():
+            for board in boards:
+                engine.get_best_move(board)
+        return run
+
+    cases = [
+        ('engine.minimax opening (cold table)', opening_minimax),
+        ('engine.search_best_move opening (cold table)', opening_search),
+        ('engine.get_best_move opening (solved table)', opening_book),
+        (f'engine.minimax {len(mid_game)} mid-game positions (cold table)', mid_game_cold),
+        ('engine.minimax all reachable (cold table)', all_positions(True)),
+        ('engine.minimax all reachable (warm table)', all_positions(False)),
+        ('engine.get_best_move all AI positions (solved table)', book_sweep),
+    ]
+
+    if TicTacToeGUI is not None:
+        def gui_opening():
+            engine.clear_transposition_table()
+            gui = headless_gui()
+            return lambda: gui.minimax(gui.board, True)
+
+        def gui_mid_game():
+            gui = headless_gui()
+            boards = [bits_to_board(x_bits, o_bits) for x_bits, o_bits, is_maximizing in mid_game]
+
+            def run():
+                for board, (x_bits, o_bits, is_maximizing) in zip(boards, mid_game):
+                    engine.transposition_table.clear()
+                    gui.minimax(board, is_maximizing)
+            return run
+
+        cases += [
+            ('gui.minimax opening (cold table)', gui_opening),
+            (f'gui.minimax {len(mid_game)} mid-game positions (cold table)', gui_mid_game),
+        ]
+
+    return cases
+
+
+def measure(prepare, repeat):
+    """
+    Time a case (best of repeat runs), then run it once more under
+    tracemalloc for the peak memory, which would distort the timing
+    """
+    best_seconds = float('inf')
+    for _ in range(repeat):
+        run = prepare()
+        engine.reset_search_stats()
+        start = time.perf_counter()
+        run()
+        best_seconds = min(best_seconds, time.perf_counter() - start)
+    nodes = engine.search_stats['nodes']
+
+    run = prepare()
+    tracemalloc.start()
+    run()
+    peak_bytes = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {
+        'nodes': nodes,
+        'seconds': best_seconds,
+        'nodes_per_sec': nodes / best_seconds if best_seconds else 0.0,
+        'peak_kb': peak_bytes / 1024
+    }
+
+
+def run_suite(repeat=5):
+    """Measure every case and return the results as a JSON-ready dict"""
+    results = {}
+    for name, prepare in suite_cases():
+        results[name] = measure(prepare, repeat)
+    return {
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'repeat': repeat,
+        'cases': results
+    }
+
+
+def find_regressions(current, baseline, tolerance):
+    """
+    Compare two suite results. A case regresses when it visits more nodes
+    than before, or is slower than the baseline by more than tolerance
+    (a fraction, e.g. 0.2 = 20%)
+    """
+    regressions = []
+    for name, result in current['cases'].items():
+        before = baseline['cases'].get(name)
+        if before is None:
+            continue
+        if result['nodes'] > before['nodes']:
+            regressions.append(f"{name}: nodes {before['nodes']} -> {result['nodes']}")
+        if result['seconds'] > before['seconds'] * (1 + tolerance):
+            regressions.append(f"{name}: time {before['seconds'] * 1000:.3f} ms -> {result['seconds'] * 1000:.3f} ms")
+    return regressions
+
+
+def print_suite(results, baseline=None):
+    print(f"{'case':<58}{'nodes':>9}{'ms':>10}{'nodes/s':>11}{'peak KB':>9}{'vs base':>9}")
+    for name, result in results['cases'].items():
+        change = ''
+        if baseline and name in baseline['cases'] and baseline['cases'][name]['seconds']:
+            change = f"{result['seconds'] / baseline['cases'][name]['seconds']:.2f}x"
+        print(f"{name:<58}{result['nodes']:>9}{result['seconds'] * 1000:>10.3f}"
+              f"{result['nodes_per_sec']:>11.0f}{result['peak_kb']:>9.1f}{change:>9}")
+
+
+def run_comparison(limit):
+    """Print the exhaustive vs alpha-beta comparison"""
+    positions = engine.all_reachable_positions()
+    if limit is not None:
+        positions = positions[:limit]
+
+    print(f"Solving {len(positions)} reachable positions with each search...\n")
+    results = compare_searches(positions)
+
+    baseline = results['exhaustive']
+    print(f"{'search':<24}{'nodes':>12}{'seconds':>10}{'speedup':>10}")
+    for name, result in results.items():
+        speedup = baseline['seconds'] / result['seconds'] if result['seconds'] else float('inf')
+        print(f"{name:<24}{result['nodes']:>12}{result['seconds']:>10.3f}{speedup:>9.1f}x")
+
+
+def main():
+    def flag_value(name, default):
+        if name in sys.argv:
+            return type(default)(sys.argv[sys.argv.index(name) + 1])
+        return default
+
+    if '--compare' in sys.argv:
+        limit = int(sys.argv[sys.argv.index('--limit') + 1]) if '--limit' in sys.argv else None
+        run_comparison(limit)
+        return
+
+    repeat = flag_value('--repeat', 5)
+    json_path = flag_value('--json', '')
+    baseline_path = flag_value('--baseline', '')
+    tolerance = flag_value('--tolerance', 0.2)
+
+    baseline = None
+    if baseline_path:
+        with open(baseline_path) as f:
+            baseline = json.load(f)
+
+    results = run_suite(repeat)
+    print_suite(results, baseline)
+
+    if json_path:
+        with open(json_path, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {json_path}")
+
+    if baseline is not None:
+        regressions = find_regressions(results, baseline, tolerance)
+        if regressions:
+            print("\nRegressions:")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+        print("\nNo regressions")
+
+
+if __name__ == "__main__":
+    main()
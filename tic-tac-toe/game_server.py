@@ -0,0 +1,163 @@
+"""
+Tic-Tac-Toe Game Server
+Hosts many games at once over a simple line-based TCP protocol
+
+Protocol - one command per line, one reply line per command:
+    NEW <game_id> [x|o]     start a game; x = human moves first (default), o = AI first
+    MOVE <game_id> <0-8>    play the human's move; the AI's reply comes in the same response
+    END <game_id>           forget a finished or abandoned game
+    QUIT                    close the connection
+
+Replies:
+    OK <game_id> <board> <status>
+    ERR <game_id> <message>
+
+<board> is 9 characters ('X', 'O' or '.' for empty) and <status> is one of
+play, x_wins, o_wins or draw. Game ids are chosen by the client and only
+need to be unique per connection.
+
+All games share the engine's solved table and transposition table, so an
+AI move is a lookup no matter how many games are running.
+
+Usage: python game_server.py [--host HOST] [--port PORT]
+"""
+
+import asyncio
+import sys
+
+import tic_tac_toe as engine
+
+MAX_GAMES_PER_CONNECTION = 10000
+
+
+class GameSession:
+    """The state of one game: just the two bitboards and the status"""
+    __slots__ = ('x_bits', 'o_bits', 'status')
+
+    def __init__(self):
+        self.x_bits = 0
+        self.o_bits = 0
+        self.status = 'play'
+
+
+def board_string(x_bits, o_bits):
+    """Format a bitboard as 9 characters for the protocol"""
+    return ''.join(
+        'X' if x_bits & (1 << i) else 'O' if o_bits & (1 << i) else '.'
+        for i in range(9)
+    )
+
+
+def game_status(x_bits, o_bits):
+    """Return play, x_wins, o_wins or draw for a bitboard"""
+    if engine.has_won(x_bits):
+        return 'x_wins'
+    if engine.has_won(o_bits):
+        return 'o_wins'
+    if x_bits | o_bits == engine.FULL_MASK:
+        return 'draw'
+    return 'play'
+
+
+def play_ai_move(session):
+    """Let the AI move in a session and update its status"""
+    move = engine.get_best_move_bits(session.x_bits, session.o_bits)
+    session.o_bits |= 1 << move
+    session.status = game_status(session.x_bits, session.o_bits)
+
+
+def handle_command(games, line):
+    """
+    Run one protocol command against a connection's games
+    Returns the reply line, or None when the client wants to quit
+    """
+    parts = line.split()
+    if not parts:
+        return "ERR - empty command"
+
+    command = parts[0].upper()
+    if command == 'QUIT':
+        return None
+    if len(parts) < 2:
+        return f"ERR - {command} needs a game id"
+    game_id = parts[1]
+
+    if command == 'NEW':
+        if game_id not in games and len(games) >= MAX_GAMES_PER_CONNECTION:
+            return f"ERR {game_id} too many games on this connection"
+        session = GameSession()
+        games[game_id] = session
+        if len(parts) > 2 and parts[2].lower() == 'o':
+            play_ai_move(session)
+
+    elif command == 'MOVE':
+        session = games.get(game_id)
+        if session is None:
+            return f"ERR {game_id} unknown game"
+        if session.status != 'play':
+            return f"ERR {game_id} game is over"
+        try:
+            move = int(parts[2])
+        except (IndexError, ValueError):
+            return f"ERR {game_id} MOVE needs a position 0-8"
+        if move < 0 or move > 8:
+            return f"ERR {game_id} position must be 0-8"
+        if (session.x_bits | session.o_bits) & (1 << move):
+            return f"ERR {game_id} position already taken"
+
+        session.x_bits |= 1 << move
+        session.status = game_status(session.x_bits, session.o_bits)
+        if session.status == 'play':
+            play_ai_move(session)
+
+    elif command == 'END':
+        games.pop(game_id, None)
+        return f"OK {game_id} {'.' * 9} closed"
+
+    else:
+        return f"ERR {game_id} unknown command {command}"
+
+    return f"OK {game_id} {board_string(session.x_bits, session.o_bits)} {session.status}"
+
+
+async def handle_client(reader, writer):
+    """Serve one TCP connection until it quits or disconnects"""
+    games = {}
+    try:
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            reply = handle_command(games, line.decode('utf-8', 'replace'))
+            if reply is None:
+                break
+            writer.write(reply.encode() + b'\n')
+            await writer.drain()
+    except (ConnectionResetError, BrokenPipeError):
+        pass
+    finally:
+        writer.close()
+
+
+async def serve(host='127.0.0.1', port=8765):
+    """Start the server and keep serving until cancelled"""
+    # Load the shared solved table before accepting any games
+    engine.get_book()
+    server = await asyncio.start_server(handle_client, host, port)
+    address = server.sockets[0].getsockname()
+    print(f"Serving tic-tac-toe on {address[0]}:{address[1]}", flush=True)
+    async with server:
+        await server.serve_forever()
+
+
+def main():
+    host = sys.argv[sys.argv.index('--host') + 1] if '--host' in sys.argv else '127.0.0.1'
+    port = int(sys.argv[sys.argv.index('--port') + 1]) if '--port' in sys.argv else 8765
+    try:
+        asyncio.run(serve(host, port))
+    except KeyboardInterrupt:
+        print("\nServer stopped")
+
+
+if __name__ == "__main__":
+    main()
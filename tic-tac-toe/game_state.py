@@ -0,0 +1,121 @@
+"""
+Tic-Tac-Toe Game State
+A board that keeps its winner and empty-cell count up to date as moves are
+made, so checking for the end of the game never rescans the board
+
+Used by both front ends (tic_tac_toe.py and tic_tac_toe_gui.py) and by the
+N x N search, which makes and unmakes moves on it.
+"""
+
+# Precomputed lines for each (size, k), shared by every GameState
+_line_cache = {}
+
+
+def generate_win_lines(size, k):
+    """
+    Generate every line of k cells that wins the game on a size x size board
+    Covers rows, columns and both diagonal directions
+    """
+    lines = []
+    directions = [(0, 1), (1, 0), (1, 1), (1, -1)]  # Right, down, down-right, down-left
+
+    for row in range(size):
+        for col in range(size):
+            for d_row, d_col in directions:
+                end_row = row + d_row * (k - 1)
+                end_col = col + d_col * (k - 1)
+                if 0 <= end_row < size and 0 <= end_col < size:
+                    lines.append(tuple((row + d_row * i) * size + col + d_col * i for i in range(k)))
+
+    return lines
+
+
+def board_lines(size, k):
+    """Return (lines, lines_through) for a board, computing them only once"""
+    if (size, k) not in _line_cache:
+        lines = generate_win_lines(size, k)
+        # Indexes of the lines passing through each cell
+        lines_through = [[] for _ in range(size * size)]
+        for index, line in enumerate(lines):
+            for cell in line:
+                lines_through[cell].append(index)
+        _line_cache[(size, k)] = (lines, lines_through)
+    return _line_cache[(size, k)]
+
+
+class GameState:
+    def __init__(self, size=3, k=3):
+        """Create an empty size x size game where k in a row wins"""
+        if k > size:
+            raise ValueError(f"Cannot get {k} in a row on a {size}x{size} board")
+
+        self.size = size
+        self.k = k
+        self.lines, self.lines_through = board_lines(size, k)
+
+        self.cells = [' ' for _ in range(size * size)]
+        self.x_bits = 0
+        self.o_bits = 0
+
+        # How many pieces each player has on every line; a line reaching
+        # k pieces is a win
+        self.line_counts = {'X': [0] * len(self.lines), 'O': [0] * len(self.lines)}
+        self.empty_count = size * size
+        self.winner = None
+
+        # (position, winner before the move) for every move, for unmake()
+        self.history = []
+
+    @classmethod
+    def from_board(cls, board, k=None):
+        """Build a state from a list board (k defaults to the board width)"""
+        size = int(len(board) ** 0.5)
+        state = cls(size, k or size)
+        for position, player in enumerate(board):
+            if player != ' ':
+                state.make(position, player)
+        return state
+
+    def make(self, position, player):
+        """Place a player's piece, updating the line counts and winner"""
+        self.history.append((position, self.winner))
+        self.cells[position] = player
+        if player == 'X':
+            self.x_bits |= 1 << position
+        else:
+            self.o_bits |= 1 << position
+        self.empty_count -= 1
+
+        counts = self.line_counts[player]
+        for line in self.lines_through[position]:
+            counts[line] += 1
+            if counts[line] == self.k and self.winner is None:
+                self.winner = player
+
+    def unmake(self):
+        """Take back the last move"""
+        position, previous_winner = self.history.pop()
+        player = self.cells[position]
+        self.cells[position] = ' '
+        if player == 'X':
+            self.x_bits &= ~(1 << position)
+        else:
+            self.o_bits &= ~(1 << position)
+        self.empty_count += 1
+
+        counts = self.line_counts[player]
+        for line in self.lines_through[position]:
+            counts[line] -= 1
+        self.winner = previous_winner
+
+    def is_full(self):
+        """Check if the board is completely filled"""
+        return self.empty_count == 0
+
+    def is_over(self):
+        """Check if the game has ended (win or draw)"""
+        return self.winner is not None or self.empty_count == 0
+
+    def available_moves(self):
+        """Get a list of all empty positions on the board"""
+        return [i for i in range(self.size * self.size) if self.cells[i] == ' ']
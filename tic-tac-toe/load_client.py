@@ -0,0 +1,157 @@
+"""
+Tic-Tac-Toe Server Load Test
+Plays many concurrent games against game_server.py and reports
+throughput and move latency
+
+Each simulated session plays random human moves until its games end.
+Sessions share a pool of TCP connections, so thousands of sessions don't
+need thousands of sockets.
+
+Usage: python load_client.py [--sessions N] [--connections N] [--games N]
+                             [--host HOST] [--port PORT] [--spawn]
+    --spawn starts a local game_server.py for the duration of the test
+"""
+
+import asyncio
+import os
+import random
+import subprocess
+import sys
+import time
+
+
+class Connection:
+    """One TCP connection carrying requests for many games"""
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.pending = {}  # game_id -> future waiting for its reply
+        self.reader_task = asyncio.create_task(self.read_replies())
+
+    async def read_replies(self):
+        """Route each reply line to the request waiting on its game id"""
+        while True:
+            line = await self.reader.readline()
+            if not line:
+                break
+            parts = line.decode().split()
+            future = self.pending.pop(parts[1], None)
+            if future is not None and not future.done():
+                future.set_result(parts)
+
+    async def request(self, game_id, command):
+        """Send a command and wait for its reply"""
+        future = asyncio.get_running_loop().create_future()
+        self.pending[game_id] = future
+        self.writer.write(command.encode() + b'\n')
+        await self.writer.drain()
+        return await future
+
+    async def close(self):
+        self.writer.write(b'QUIT\n')
+        await self.writer.drain()
+        await self.reader_task
+        self.writer.close()
+
+
+async def play_session(connection, session_no, games, stats, rng):
+    """Play a number of games with random human moves"""
+    for game_no in range(games):
+        game_id = f"{session_no}-{game_no}"
+        first = rng.choice('xo')
+        reply = await connection.request(game_id, f"NEW {game_id} {first}")
+
+        while reply[0] == 'OK' and reply[3] == 'play':
+            board = reply[2]
+            move = rng.choice([i for i in range(9) if board[i] == '.'])
+
+            start = time.perf_counter()
+            reply = await connection.request(game_id, f"MOVE {game_id} {move}")
+            stats['latencies'].append(time.perf_counter() - start)
+
+        if reply[0] != 'OK':
+            stats['errors'] += 1
+        else:
+            stats['results'][reply[3]] = stats['results'].get(reply[3], 0) + 1
+        await connection.request(game_id, f"END {game_id}")
+
+
+def percentile(sorted_values, fraction):
+    """Return a percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(fraction * len(sorted_values)))
+    return sorted_values[index]
+
+
+async def run_load_test(host, port, sessions, connections, games):
+    """Run every session concurrently and return the collected stats"""
+    pool = []
+    for _ in range(connections):
+        reader, writer = await asyncio.open_connection(host, port)
+        pool.append(Connection(reader, writer))
+
+    stats = {'latencies': [], 'errors': 0, 'results': {}}
+    rng = random.Random(42)
+
+    start = time.perf_counter()
+    await asyncio.gather(*[
+        play_session(pool[i % connections], i, games, stats, rng)
+        for i in range(sessions)
+    ])
+    stats['seconds'] = time.perf_counter() - start
+
+    for connection in pool:
+        await connection.close()
+    return stats
+
+
+def print_report(stats, sessions):
+    latencies = sorted(stats['latencies'])
+    moves = len(latencies)
+    print(f"Sessions:     {sessions}")
+    print(f"Moves:        {moves} in {stats['seconds']:.2f} s")
+    print(f"Throughput:   {moves / stats['seconds']:.0f} moves/sec")
+    print(f"Latency p50:  {percentile(latencies, 0.50) * 1000:.2f} ms")
+    print(f"Latency p99:  {percentile(latencies, 0.99) * 1000:.2f} ms")
+    print(f"Latency max:  {percentile(latencies, 1.0) * 1000:.2f} ms")
+    print(f"Results:      {stats['results']}  errors: {stats['errors']}")
+
+
+def start_local_server(port):
+    """Start game_server.py in a subprocess and wait until it listens"""
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'game_server.py')
+    server = subprocess.Popen(
+        [sys.executable, script, '--port', str(port)],
+        stdout=subprocess.PIPE, text=True
+    )
+    server.stdout.readline()  # "Serving tic-tac-toe on ..."
+    return server
+
+
+def main():
+    def flag_value(name, default):
+        if name in sys.argv:
+            return type(default)(sys.argv[sys.argv.index(name) + 1])
+        return default
+
+    sessions = flag_value('--sessions', 1000)
+    connections = min(sessions, flag_value('--connections', 50))
+    games = flag_value('--games', 1)
+    host = flag_value('--host', '127.0.0.1')
+    port = flag_value('--port', 8765)
+
+    server = start_local_server(port) if '--spawn' in sys.argv else None
+    try:
+        stats = asyncio.run(run_load_test(host, port, sessions, connections, games))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    print_report(stats, sessions)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""
+N x N Tic-Tac-Toe Engine (K in a row)
+An AI for bigger boards, where searching the whole game tree is impossible
+
+It uses iterative deepening alpha-beta: search 1 move ahead, then 2, then 3...
+until the time budget for the move runs out, and play the best move of the
+deepest search that finished. Positions at the search horizon are scored
+with a heuristic instead of playing them out.
+"""
+
+import time
+
+from game_state import GameState, board_lines
+
+# Board representation is the same as in tic_tac_toe.py: a list of
+# size * size cells holding ' ', 'X' (human) or 'O' (AI)
+
+WIN_SCORE = 1000000  # Far above any heuristic score
+
+
+class SearchTimeout(Exception):
+    """Raised inside the search when the time budget for a move runs out"""
+
+
+class NxNEngine:
+    def __init__(self, size=4, k=4, time_budget_ms=1000):
+        """Precompute the win lines and move order for a board size"""
+        if k > size:
+            raise ValueError(f"Cannot get {k} in a row on a {size}x{size} board")
+
+        self.size = size
+        self.k = k
+        self.time_budget_ms = time_budget_ms
+        self.cells = size * size
+        self.lines = board_lines(size, k)[0]
+
+        # Central cells belong to more lines, so they are tried first
+        center = (size - 1) / 2
+        self.move_order = sorted(
+            range(self.cells),
+            key=lambda cell: abs(cell // size - center) + abs(cell % size - center)
+        )
+
+        # Heuristic weight of a line holding n pieces of one player only
+        self.line_weights = [0] + [10 ** (n - 1) for n in range(1, k + 1)]
+
+        # Optional callable checked during the search; returning True stops
+        # it like a timeout (used to cancel a search that is no longer needed)
+        self.should_stop = None
+
+        self.nodes = 0
+        self.last_depth = 0
+        self._deadline = 0.0
+
+    def evaluate(self, state):
+        """
+        Heuristic score of a GameState from the AI's point of view
+        Lines still open for only one player count for that player,
+        weighted by how many pieces they already hold
+        """
+        score = 0
+        weights = self.line_weights
+        for ai_count, human_count in zip(state.line_counts['O'], state.line_counts['X']):
+            if human_count == 0:
+                score += weights[ai_count]
+            elif ai_count == 0:
+                score -= weights[human_count]
+        return score
+
+    # ===== ITERATIVE DEEPENING ALPHA-BETA =====
+
+    def _search(self, state, depth, ply, is_maximizing, alpha, beta):
+        """
+        Depth-limited Minimax with alpha-beta pruning on a GameState
+        Moves are made and unmade in place; the state tracks wins as it goes.
+        Wins are scored WIN_SCORE minus the plies needed, so faster wins
+        (and slower losses) are preferred
+        """
+        self.nodes += 1
+        if self.nodes & 1023 == 0:
+            if time.perf_counter() > self._deadline or (self.should_stop and self.should_stop()):
+                raise SearchTimeout()
+
+        if depth == 0:
+            return self.evaluate(state)
+
+        player = 'O' if is_maximizing else 'X'
+        best_score = -float('inf') if is_maximizing else float('inf')
+        moved = False
+
+        cells = state.cells
+        for move in self.move_order:
+            if cells[move] != ' ':
+                continue
+            moved = True
+
+            state.make(move, player)
+            if state.winner is not None:
+                score = WIN_SCORE - ply if is_maximizing else ply - WIN_SCORE
+            else:
+                score = self._search(state, depth - 1, ply + 1, not is_maximizing, alpha, beta)
+            state.unmake()
+
+            if is_maximizing:
+                best_score = max(best_score, score)
+                alpha = max(alpha, best_score)
+            else:
+                best_score = min(best_score, score)
+                beta = min(beta, best_score)
+            if alpha >= beta:
+                break
+
+        if not moved:  # Board full: draw
+            return 0
+        return best_score
+
+    def _search_root(self, state, depth, moves):
+        """Search every root move to a fixed depth, returning (move, score)"""
+        best_move = moves[0]
+        best_score = -float('inf')
+
+        for move in moves:
+            state.make(move, 'O')
+            if state.winner is not None:
+                score = WIN_SCORE
+            else:
+                score = self._search(state, depth - 1, 2, False, best_score, float('inf'))
+            state.unmake()
+
+            if score > best_score:
+                best_score = score
+                best_move = move
+
+        return best_move, best_score
+
+    def get_best_move(self, board):
+        """
+        Find the best move for the AI within the time budget
+        Returns the position where the AI should play, or None if the board is full
+        """
+        moves = [cell for cell in self.move_order if board[cell] == ' ']
+        if not moves:
+            return None
+
+        self.nodes = 0
+        self.last_depth = 0
+        self._deadline = time.perf_counter() + self.time_budget_ms / 1000
+        best_move = moves[0]
+
+        # The search works on its own state so a timeout never leaves
+        # pieces on the caller's board
+        state = GameState.from_board(board, self.k)
+
+        for depth in range(1, len(moves) + 1):
+            try:
+                move, score = self._search_root(state, depth, moves)
+            except SearchTimeout:
+                break  # Keep the result of the last finished depth
+
+            best_move = move
+            self.last_depth = depth
+
+            # Search the previous best move first at the next depth
+            moves.remove(move)
+            moves.insert(0, move)
+
+            if abs(score) >= WIN_SCORE - self.cells:
+                break  # Forced win or loss found, deeper search changes nothing
+
+        return best_move
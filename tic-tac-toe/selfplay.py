@@ -0,0 +1,172 @@
+"""
+Tic-Tac-Toe Batch Self-Play and Position Evaluation
+Runs large numbers of games or position evaluations across a process pool
+
+Every worker memory-maps the same solved table file, so the table is read
+only once into the OS page cache and shared by all of them. Each worker also
+keeps its own transposition table warm between tasks.
+
+Policies for self_play():
+    'random'    random human (X) against the AI (O)
+    'ai'        AI against AI
+    'openings'  AI against AI, cycling through every possible first move
+    'selfcheck' random moves for both sides (sanity baseline)
+
+Usage: python selfplay.py [--games N] [--policy NAME] [--processes N]
+"""
+
+import multiprocessing
+import os
+import random
+import sys
+import time
+
+import tic_tac_toe as engine
+
+POLICIES = ['random', 'ai', 'openings', 'selfcheck']
+
+
+def _init_worker():
+    """Load the shared solved table once per worker process"""
+    engine.get_book()
+
+
+def _pool_map(function, items, processes, chunksize):
+    """Map over items in a process pool, or in-process for one process"""
+    if processes == 1:
+        _init_worker()
+        return [function(item) for item in items]
+    with multiprocessing.Pool(processes, initializer=_init_worker) as pool:
+        return pool.map(function, items, chunksize=chunksize)
+
+
+def _default_chunksize(count, processes):
+    """Give each worker a few large chunks to keep task overhead low"""
+    return max(1, count // (processes * 4))
+
+
+# ===== POSITION EVALUATION =====
+
+def _evaluate_bits(bits):
+    """Worker: best AI move and exact score of one (x_bits, o_bits) position"""
+    return engine.search_best_move(*bits)
+
+
+def evaluate_positions(boards, processes=None, chunksize=None):
+    """
+    Find the AI's best move and score for many boards at once
+    boards is a list of list boards with the AI ('O') to move.
+    Returns (results, stats) where results[i] is (move, score) for boards[i]
+    (score as in minimax(): positive means the AI wins with best play)
+    and stats holds the count, seconds and positions per second.
+    """
+    processes = processes or os.cpu_count() or 1
+    positions = [engine.board_to_bits(board) for board in boards]
+    chunksize = chunksize or _default_chunksize(len(positions), processes)
+
+    start = time.perf_counter()
+    results = _pool_map(_evaluate_bits, positions, processes, chunksize)
+    seconds = time.perf_counter() - start
+
+    stats = {
+        'positions': len(positions),
+        'seconds': seconds,
+        'positions_per_sec': len(positions) / seconds if seconds else float('inf')
+    }
+    return results, stats
+
+
+# ===== SELF-PLAY =====
+
+def _choose_move(x_bits, o_bits, player, is_random, rng):
+    """Pick a move for the player to move, at random or with the AI"""
+    if is_random:
+        return rng.choice(engine.generate_moves(x_bits, o_bits))
+    if player == 'O':
+        return engine.get_best_move_bits(x_bits, o_bits)
+    # The engine always plays 'O'; swapping the boards lets it play 'X'
+    return engine.get_best_move_bits(o_bits, x_bits)
+
+
+def _play_one_game(task):
+    """Worker: play one game and return 'x_wins', 'o_wins' or 'draw'"""
+    policy, game_no, seed = task
+    rng = random.Random(seed + game_no)
+
+    x_bits = o_bits = 0
+    player = 'X'
+    x_random = policy in ('random', 'selfcheck')
+    o_random = policy == 'selfcheck'
+
+    if policy == 'openings':
+        # Games cycle through the 9 first moves, X and O starting in turn
+        first_move = game_no % 9
+        player = 'X' if (game_no // 9) % 2 == 0 else 'O'
+        if player == 'X':
+            x_bits = 1 << first_move
+        else:
+            o_bits = 1 << first_move
+        player = 'O' if player == 'X' else 'X'
+
+    while True:
+        if engine.has_won(x_bits):
+            return 'x_wins'
+        if engine.has_won(o_bits):
+            return 'o_wins'
+        if x_bits | o_bits == engine.FULL_MASK:
+            return 'draw'
+
+        if player == 'X':
+            x_bits |= 1 << _choose_move(x_bits, o_bits, 'X', x_random, rng)
+            player = 'O'
+        else:
+            o_bits |= 1 << _choose_move(x_bits, o_bits, 'O', o_random, rng)
+            player = 'X'
+
+
+def self_play(n_games, policy='random', processes=None, seed=0, chunksize=None):
+    """
+    Play n_games with a policy (see POLICIES) across a process pool
+    Games are seeded by their number, so a run is reproducible regardless
+    of how many processes play it.
+    Returns a dict of win/draw/loss counts plus throughput numbers.
+    """
+    if policy not in POLICIES:
+        raise ValueError(f"Unknown policy {policy!r}, choose from {POLICIES}")
+
+    processes = processes or os.cpu_count() or 1
+    chunksize = chunksize or _default_chunksize(n_games, processes)
+    tasks = [(policy, game_no, seed) for game_no in range(n_games)]
+
+    start = time.perf_counter()
+    outcomes = _pool_map(_play_one_game, tasks, processes, chunksize)
+    seconds = time.perf_counter() - start
+
+    return {
+        'policy': policy,
+        'games': n_games,
+        'x_wins': outcomes.count('x_wins'),
+        'o_wins': outcomes.count('o_wins'),
+        'draws': outcomes.count('draw'),
+        'processes': processes,
+        'seconds': seconds,
+        'games_per_sec': n_games / seconds if seconds else float('inf')
+    }
+
+
+def main():
+    games = int(sys.argv[sys.argv.index('--games') + 1]) if '--games' in sys.argv else 10000
+    policy = sys.argv[sys.argv.index('--policy') + 1] if '--policy' in sys.argv else 'random'
+    processes = int(sys.argv[sys.argv.index('--processes') + 1]) if '--processes' in sys.argv else None
+
+    # Build the table before forking so workers don't race to write it
+    engine.get_book()
+
+    result = self_play(games, policy, processes)
+    print(f"Policy {result['policy']}: {result['games']} games on {result['processes']} processes")
+    print(f"X wins: {result['x_wins']}  O wins: {result['o_wins']}  Draws: {result['draws']}")
+    print(f"{result['seconds']:.2f} s, {result['games_per_sec']:.0f} games/sec")
+
+
+if __name__ == "__main__":
+    main()
@@ -7,6 +7,31 @@ A simple AI that plays perfectly using the Minimax algorithm
 # The board is a list of 9 positions (0-8)
 # Empty positions are marked with a space ' '
 # Player uses 'X' and AI uses 'O'
+#
+# The search works on a compact bitboard instead: a position is a pair
+# of 9-bit integers (x_bits, o_bits), where bit i is set when that player
+# owns position i. Win checks and move generation become a few integer ops.
+
+import mmap
+import os
+import sys
+import time
+
+from game_state import GameState
+from nxn_engine import NxNEngine
+
+# All possible winning combinations
+WIN_PATTERNS = [
+    [0, 1, 2],  # Top row
+    [3, 4, 5],  # Middle row
+    [6, 7, 8],  # Bottom row
+    [0, 3, 6],  # Left column
+    [1, 4, 7],  # Middle column
+    [2, 5, 8],  # Right column
+    [0, 4, 8],  # Diagonal top-left to bottom-right
+    [2, 4, 6]   # Diagonal top-right to bottom-left
+]
+
 
 def create_board():
     """Create an empty tic-tac-toe board"""
@@ -14,65 +39,175 @@ def create_board():
 
 
 def print_board(board):
-    """Display the current board state in a nice format"""
+    """Display the current board state in a nice format (any square size)"""
+    size = int(len(board) ** 0.5)
+    
     print("\n")
-    print(f" {board[0]} | {board[1]} | {board[2]} ")
-    print("---|---|---")
-    print(f" {board[3]} | {board[4]} | {board[5]} ")
-    print("---|---|---")
-    print(f" {board[6]} | {board[7]} | {board[8]} ")
+    for row in range(size):
+        print("|".join(f" {board[row * size + col]} " for col in range(size)))
+        if row < size - 1:
+            print("|".join(["---"] * size))
     print("\n")
     
     # Show position numbers for reference
+    width = len(str(size * size - 1))
     print("Position numbers:")
-    print(" 0 | 1 | 2 ")
-    print("---|---|---")
-    print(" 3 | 4 | 5 ")
-    print("---|---|---")
-    print(" 6 | 7 | 8 ")
+    for row in range(size):
+        print("|".join(f" {row * size + col:>{width}} " for col in range(size)))
+        if row < size - 1:
+            print("|".join(["-" * (width + 2)] * size))
     print("\n")
 
 
+# ===== BITBOARD REPRESENTATION =====
+
+FULL_MASK = 0b111111111  # All 9 positions taken
+
+# Each winning pattern as a bit mask, e.g. top row -> 0b000000111
+WIN_MASKS = [sum(1 << i for i in pattern) for pattern in WIN_PATTERNS]
+
+# For every 9-bit set of empty positions, the tuple of those positions.
+# Move generation is then a single table lookup.
+MOVES_FOR_EMPTY = [tuple(i for i in range(9) if empty & (1 << i)) for empty in range(512)]
+
+# Moves are tried center first, then corners, then edges. Strong moves
+# first lets alpha-beta cut off the remaining branches sooner.
+MOVE_ORDER = [4, 0, 2, 6, 8, 1, 3, 5, 7]
+ORDERED_MOVES_FOR_EMPTY = [tuple(i for i in MOVE_ORDER if empty & (1 << i)) for empty in range(512)]
+
+# Number of pieces for every 9-bit mask of taken positions
+PIECE_COUNT = [bin(bits).count('1') for bits in range(512)]
+
+
+def player_bits(board, player):
+    """Return the bit mask of positions owned by a player on a list board"""
+    bits = 0
+    for i in range(9):
+        if board[i] == player:
+            bits |= 1 << i
+    return bits
+
+
+def board_to_bits(board):
+    """Convert a list board into an (x_bits, o_bits) bitboard"""
+    return player_bits(board, 'X'), player_bits(board, 'O')
+
+
+def has_won(bits):
+    """Check if a player's bit mask contains a complete winning pattern"""
+    for mask in WIN_MASKS:
+        if bits & mask == mask:
+            return True
+    return False
+
+
+def generate_moves(x_bits, o_bits):
+    """Get the empty positions of a bitboard (a shared tuple, do not modify)"""
+    return MOVES_FOR_EMPTY[FULL_MASK & ~(x_bits | o_bits)]
+
+
+def generate_ordered_moves(x_bits, o_bits):
+    """Get the empty positions of a bitboard, most promising first"""
+    return ORDERED_MOVES_FOR_EMPTY[FULL_MASK & ~(x_bits | o_bits)]
+
+
 def check_winner(board, player):
     """
     Check if a player has won the game
     Returns True if the player has three in a row
     """
-    # All possible winning combinations
-    win_patterns = [
-        [0, 1, 2],  # Top row
-        [3, 4, 5],  # Middle row
-        [6, 7, 8],  # Bottom row
-        [0, 3, 6],  # Left column
-        [1, 4, 7],  # Middle column
-        [2, 5, 8],  # Right column
-        [0, 4, 8],  # Diagonal top-left to bottom-right
-        [2, 4, 6]   # Diagonal top-right to bottom-left
-    ]
-    
-    # Check each winning pattern
-    for pattern in win_patterns:
-        if (board[pattern[0]] == player and 
-            board[pattern[1]] == player and 
-            board[pattern[2]] == player):
-            return True
-    
-    return False
+    return has_won(player_bits(board, player))
 
 
 def is_board_full(board):
     """Check if the board is completely filled"""
-    return ' ' not in board
+    x_bits, o_bits = board_to_bits(board)
+    return x_bits | o_bits == FULL_MASK
 
 
 def get_available_moves(board):
     """Get a list of all empty positions on the board"""
-    return [i for i in range(9) if board[i] == ' ']
+    return list(generate_moves(*board_to_bits(board)))
 
 
 def game_over(board):
     """Check if the game has ended (win or draw)"""
-    return check_winner(board, 'X') or check_winner(board, 'O') or is_board_full(board)
+    x_bits, o_bits = board_to_bits(board)
+    return has_won(x_bits) or has_won(o_bits) or x_bits | o_bits == FULL_MASK
+
+
+# ===== SYMMETRY & TRANSPOSITION TABLE =====
+
+# The 8 symmetries of the 3x3 grid (4 rotations, each optionally mirrored).
+# Each entry lists, for every position of the transformed board, which
+# position of the original board it comes from.
+SYMMETRIES = [
+    [0, 1, 2, 3, 4, 5, 6, 7, 8],  # Identity
+    [6, 3, 0, 7, 4, 1, 8, 5, 2],  # Rotate 90
+    [8, 7, 6, 5, 4, 3, 2, 1, 0],  # Rotate 180
+    [2, 5, 8, 1, 4, 7, 0, 3, 6],  # Rotate 270
+    [2, 1, 0, 5, 4, 3, 8, 7, 6],  # Mirror left-right
+    [6, 7, 8, 3, 4, 5, 0, 1, 2],  # Mirror top-bottom
+    [0, 3, 6, 1, 4, 7, 2, 5, 8],  # Mirror on main diagonal
+    [8, 5, 2, 7, 4, 1, 6, 3, 0]   # Mirror on anti-diagonal
+]
+
+# Every symmetry applied to every possible 9-bit mask, so transforming a
+# bitboard is a table lookup instead of moving bits one at a time
+SYMMETRY_TABLES = [
+    [sum(1 << new for new, old in enumerate(symmetry) if bits & (1 << old))
+     for bits in range(512)]
+    for symmetry in SYMMETRIES
+]
+
+# Scores of already searched positions, shared by every game in the process.
+# Keyed by (canonical bitboard, is_maximizing) so that all 8 symmetric
+# versions of a position share a single entry. Alpha-beta can stop early,
+# so each entry is (score, flag) where the flag says whether the score is
+# exact or only a bound on the real score.
+transposition_table = {}
+search_stats = {'hits': 0, 'misses': 0, 'nodes': 0}
+
+EXACT = 0
+LOWER_BOUND = 1  # Real score is at least this (search stopped on a cutoff)
+UPPER_BOUND = 2  # Real score is at most this (no move beat alpha)
+
+
+def canonical_bits(x_bits, o_bits):
+    """
+    Return one representative 18-bit key for a bitboard and all its symmetries
+    Rotated or mirrored boards have the same minimax score, so they can
+    share a transposition table entry
+    """
+    return min(table[x_bits] | (table[o_bits] << 9) for table in SYMMETRY_TABLES)
+
+
+def canonical_key(board):
+    """Return the canonical symmetry key of a list board"""
+    return canonical_bits(*board_to_bits(board))
+
+
+def clear_transposition_table():
+    """Forget all solved positions and reset the search counters"""
+    transposition_table.clear()
+    reset_search_stats()
+
+
+def reset_search_stats():
+    """Reset the node and hit/miss counters, keeping the table"""
+    search_stats['hits'] = 0
+    search_stats['misses'] = 0
+    search_stats['nodes'] = 0
+
+
+def get_search_stats():
+    """Return search counters (nodes visited, table hits, misses and size)"""
+    return {
+        'nodes': search_stats['nodes'],
+        'hits': search_stats['hits'],
+        'misses': search_stats['misses'],
+        'size': len(transposition_table)
+    }
 
 
 # ===== MINIMAX ALGORITHM - THE AI BRAIN =====
@@ -88,102 +223,327 @@ def minimax(board, is_maximizing):
     4. Minimizing player (Human 'X') wants the lowest score
     
     Scoring:
-    - AI wins: +1 (best for AI)
-    - Human wins: -1 (worst for AI)
+    - AI wins: +(10 - pieces on the board), so faster wins score higher
+    - Human wins: -(10 - pieces on the board), so slower losses are preferred
     - Draw: 0 (neutral)
+    
+    The list board is converted once and searched as a bitboard.
+    """
+    x_bits, o_bits = board_to_bits(board)
+    return minimax_bits(x_bits, o_bits, is_maximizing)
+
+
+def minimax_bits(x_bits, o_bits, is_maximizing, alpha=-float('inf'), beta=float('inf')):
+    """
+    Minimax with alpha-beta pruning on a bitboard
+    
+    alpha is the score the AI is already guaranteed elsewhere and beta the
+    score the human is already guaranteed. Once a branch can't land between
+    them, the rest of its moves are skipped. With the default window the
+    exact score is returned.
+    
+    Searched positions are stored in the transposition table, so each
+    position (up to symmetry) is only searched once per process.
     """
+    search_stats['nodes'] += 1
+    
+    # Reuse the score if this position was already searched with a
+    # result that is good enough for the current window
+    key = (canonical_bits(x_bits, o_bits), is_maximizing)
+    entry = transposition_table.get(key)
+    if entry is not None:
+        score, flag = entry
+        if (flag == EXACT or
+                (flag == LOWER_BOUND and score >= beta) or
+                (flag == UPPER_BOUND and score <= alpha)):
+            search_stats['hits'] += 1
+            return score
+    search_stats['misses'] += 1
     
     # Base case: Check if game is over
-    if check_winner(board, 'O'):  # AI wins
-        return 1
-    if check_winner(board, 'X'):  # Human wins
-        return -1
-    if is_board_full(board):  # Draw
+    # The last move made the win, so fewer pieces means a faster win
+    if has_won(o_bits):  # AI wins
+        return 10 - PIECE_COUNT[x_bits | o_bits]
+    if has_won(x_bits):  # Human wins
+        return PIECE_COUNT[x_bits | o_bits] - 10
+    if x_bits | o_bits == FULL_MASK:  # Draw
         return 0
     
-    # Recursive case: Try all possible moves
+    original_alpha = alpha
+    original_beta = beta
+    
+    # Recursive case: Try all possible moves, most promising first
     if is_maximizing:
         # AI's turn - wants to maximize the score
         best_score = -float('inf')  # Start with worst possible score
         
-        for move in get_available_moves(board):
-            board[move] = 'O'  # Try this move
-            score = minimax(board, False)  # See what happens next
-            board[move] = ' '  # Undo the move
+        for move in generate_ordered_moves(x_bits, o_bits):
+            # Placing a piece is just setting a bit, no undo needed
+            score = minimax_bits(x_bits, o_bits | (1 << move), False, alpha, beta)
             best_score = max(score, best_score)  # Keep the best score
-        
-        return best_score
+            alpha = max(alpha, best_score)
+            if alpha >= beta:
+                break  # The human will never allow this branch
     
     else:
         # Human's turn - wants to minimize the score
         best_score = float('inf')  # Start with worst possible score for minimizer
         
-        for move in get_available_moves(board):
-            board[move] = 'X'  # Try this move
-            score = minimax(board, True)  # See what happens next
-            board[move] = ' '  # Undo the move
+        for move in generate_ordered_moves(x_bits, o_bits):
+            score = minimax_bits(x_bits | (1 << move), o_bits, True, alpha, beta)
             best_score = min(score, best_score)  # Keep the best score
-        
-        return best_score
+            beta = min(beta, best_score)
+            if alpha >= beta:
+                break  # The AI will never allow this branch
+    
+    if best_score <= original_alpha:
+        flag = UPPER_BOUND
+    elif best_score >= original_beta:
+        flag = LOWER_BOUND
+    else:
+        flag = EXACT
+    transposition_table[key] = (best_score, flag)
+    return best_score
 
 
-def get_best_move(board):
+def search_best_move(x_bits, o_bits):
     """
-    Find the best move for the AI using Minimax
-    Returns the position (0-8) where AI should play
+    Search a bitboard for the AI's best move
+    Returns (move, score), with move None if there is nothing to play
     """
     best_score = -float('inf')
     best_move = None
     
-    # Try each available position
-    for move in get_available_moves(board):
-        board[move] = 'O'  # Make the move
-        score = minimax(board, False)  # Calculate the score
-        board[move] = ' '  # Undo the move
+    # Try each available position, most promising first
+    for move in generate_ordered_moves(x_bits, o_bits):
+        # Only moves that beat the best score so far matter, so the
+        # best score is passed down as alpha
+        score = minimax_bits(x_bits, o_bits | (1 << move), False, best_score)
         
         # If this move is better than previous ones, remember it
         if score > best_score:
             best_score = score
             best_move = move
     
-    return best_move
+    return best_move, best_score
+
+
+def get_best_move(board):
+    """
+    Find the best move for the AI using Minimax
+    Returns the position (0-8) where AI should play
+    
+    Positions covered by the solved table are answered with one lookup,
+    anything else falls back to the search.
+    """
+    return get_best_move_bits(*board_to_bits(board))
+
+
+def get_best_move_bits(x_bits, o_bits):
+    """Find the best move for the AI on a bitboard (see get_best_move)"""
+    book = get_book()
+    if book is not None:
+        entry = book[BOOK_HEADER_SIZE + encode_position(x_bits, o_bits)]
+        if entry != BOOK_MISSING:
+            move = entry & 0x0F
+            return None if move == BOOK_NO_MOVE else move
+    
+    return search_best_move(x_bits, o_bits)[0]
+
+
+# ===== SOLVED POSITION TABLE (OPENING BOOK) =====
+
+# Every position where the AI is to move is solved once and written to disk
+# as a packed array with one byte per base-3 board code (3^9 entries):
+# - low 4 bits: best AI move (0-8)
+# - high 4 bits: result with best play + 1 (0 = loss, 1 = draw, 2 = win)
+# The file is memory-mapped, so loading it costs almost nothing and it is
+# shared between processes through the OS page cache.
+
+BOOK_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tic_tac_toe_book.bin')
+BOOK_MAGIC = b'TTTBOOK2'  # Change when the stored scores/moves change meaning
+BOOK_HEADER_SIZE = len(BOOK_MAGIC)
+BOOK_ENTRIES = 3 ** 9
+BOOK_MISSING = 0xFF  # Position is not in the table (illegal or game over)
+BOOK_NO_MOVE = 0x0F
+
+# Base-3 value of each 9-bit mask, so a bitboard is encoded with two lookups
+BASE3 = [sum(3 ** i for i in range(9) if bits & (1 << i)) for bits in range(512)]
+
+_book = None
+_book_tried = False
+book_info = {'size_bytes': 0, 'load_ms': 0.0, 'built': False}
+
+
+def encode_position(x_bits, o_bits):
+    """Encode a bitboard as a base-3 number (empty = 0, X = 1, O = 2)"""
+    return BASE3[x_bits] + 2 * BASE3[o_bits]
+
+
+def all_reachable_positions():
+    """
+    List every non-terminal position reachable in a real game
+    Returns (x_bits, o_bits, is_maximizing) tuples, covering games
+    started by either player
+    """
+    positions = []
+    seen = set()
+    stack = [(0, 0, False), (0, 0, True)]
+    
+    while stack:
+        x_bits, o_bits, is_maximizing = stack.pop()
+        if (x_bits, o_bits, is_maximizing) in seen:
+            continue
+        seen.add((x_bits, o_bits, is_maximizing))
+        
+        if has_won(x_bits) or has_won(o_bits) or x_bits | o_bits == FULL_MASK:
+            continue
+        positions.append((x_bits, o_bits, is_maximizing))
+        
+        for move in generate_moves(x_bits, o_bits):
+            if is_maximizing:
+                stack.append((x_bits, o_bits | (1 << move), False))
+            else:
+                stack.append((x_bits | (1 << move), o_bits, True))
+    
+    return positions
+
+
+def build_book(path=BOOK_PATH):
+    """
+    Solve every reachable position with the AI to move and write the table
+    Returns the number of positions stored
+    """
+    table = bytearray([BOOK_MISSING]) * BOOK_ENTRIES
+    solved = 0
+    
+    for x_bits, o_bits, is_maximizing in all_reachable_positions():
+        if not is_maximizing:
+            continue
+        move, score = search_best_move(x_bits, o_bits)
+        result = (score > 0) - (score < 0)
+        table[encode_position(x_bits, o_bits)] = ((result + 1) << 4) | move
+        solved += 1
+    
+    # Write to a temporary file first so readers never see a half-written table
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(BOOK_MAGIC)
+        f.write(table)
+    os.replace(tmp_path, path)
+    return solved
+
+
+def _book_is_valid(path):
+    """Check that a table file exists and matches the current format"""
+    if not os.path.exists(path) or os.path.getsize(path) != BOOK_HEADER_SIZE + BOOK_ENTRIES:
+        return False
+    with open(path, 'rb') as f:
+        return f.read(BOOK_HEADER_SIZE) == BOOK_MAGIC
+
+
+def load_book(path=BOOK_PATH):
+    """
+    Memory-map the solved table, building it first if it is missing or stale
+    Returns the mapped table, or None if it cannot be built or read
+    """
+    global _book
+    start = time.perf_counter()
+    
+    try:
+        if not _book_is_valid(path):
+            build_book(path)
+            book_info['built'] = True
+        with open(path, 'rb') as f:
+            book = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except OSError:
+        # Read-only install or similar: the search still works without it
+        return None
+    
+    _book = book
+    book_info['size_bytes'] = len(book)
+    book_info['load_ms'] = (time.perf_counter() - start) * 1000
+    return book
+
+
+def get_book():
+    """Return the solved table, loading it on first use"""
+    global _book_tried
+    if not _book_tried:
+        # Only try once; if loading fails the search is used instead
+        _book_tried = True
+        load_book()
+    return _book
 
 
 # ===== GAME LOOP - MAIN GAMEPLAY =====
 
-def play_game():
-    """Main game function that handles the game flow"""
+def parse_board_flags(argv):
+    """
+    Read the board options from the command line
+    --size N      board is N x N (default 3)
+    --k K         K in a row wins (default: same as size)
+    --budget MS   AI thinking time per move on bigger boards (default 1000)
+    """
+    def flag_value(name, default):
+        if name in argv:
+            return int(argv[argv.index(name) + 1])
+        return default
+    
+    size = flag_value('--size', 3)
+    k = flag_value('--k', size)
+    time_budget_ms = flag_value('--budget', 1000)
+    return size, k, time_budget_ms
+
+
+def play_game(size=3, k=3, time_budget_ms=1000):
+    """
+    Main game function that handles the game flow
+    The classic 3x3 game uses the perfect Minimax AI; any other size uses
+    the N x N engine with a time budget per move
+    """
+    classic = (size, k) == (3, 3)
+    state = GameState(size, k)
+    
     print("=" * 50)
-    print("Welcome to Tic-Tac-Toe with Unbeatable AI!")
+    print("Welcome to Tic-Tac-Toe with Unbeatable AI!" if classic else
+          f"Welcome to {size}x{size} Tic-Tac-Toe ({k} in a row)!")
     print("=" * 50)
     print("\nYou are 'X' and the AI is 'O'")
-    print("The AI uses the Minimax algorithm - Good luck!\n")
     
-    board = create_board()
+    if classic:
+        print("The AI uses the Minimax algorithm - Good luck!\n")
+        if get_book() is not None:
+            print(f"(Solved table: {book_info['size_bytes']} bytes, loaded in {book_info['load_ms']:.2f} ms)\n")
+    else:
+        print(f"The AI searches as deep as it can in {time_budget_ms} ms - Good luck!\n")
+        nxn = NxNEngine(size, k, time_budget_ms)
+    board = state.cells
+    last_position = len(board) - 1
     
     # Ask who goes first
     first = input("Do you want to go first? (y/n): ").lower()
     human_turn = first == 'y'
     
     # Main game loop
-    while not game_over(board):
+    while not state.is_over():
         print_board(board)
         
         if human_turn:
             # Human player's turn
             print("Your turn (X)")
             try:
-                move = int(input("Enter position (0-8): "))
+                move = int(input(f"Enter position (0-{last_position}): "))
                 
                 # Validate the move
-                if move < 0 or move > 8:
-                    print("Invalid position! Choose between 0-8")
+                if move < 0 or move > last_position:
+                    print(f"Invalid position! Choose between 0-{last_position}")
                     continue
                 if board[move] != ' ':
                     print("That position is already taken!")
                     continue
                 
-                board[move] = 'X'
+                state.make(move, 'X')
                 human_turn = False
                 
             except ValueError:
@@ -193,17 +553,20 @@ def play_game():
         else:
             # AI's turn
             print("AI is thinking...")
-            move = get_best_move(board)
-            board[move] = 'O'
+            if classic:
+                move = get_best_move_bits(state.x_bits, state.o_bits)
+            else:
+                move = nxn.get_best_move(board)
+            state.make(move, 'O')
             print(f"AI played position {move}")
             human_turn = True
     
     # Game over - show final board and result
     print_board(board)
     
-    if check_winner(board, 'X'):
-        print("🎉 Congratulations! You won! (This should be impossible!)")
-    elif check_winner(board, 'O'):
+    if state.winner == 'X':
+        print("🎉 Congratulations! You won!" + (" (This should be impossible!)" if classic else ""))
+    elif state.winner == 'O':
         print("🤖 AI wins! Better luck next time!")
     else:
         print("🤝 It's a draw! Well played!")
@@ -211,10 +574,16 @@ def play_game():
 
 # Start the game
 if __name__ == "__main__":
-    play_game()
+    if '--build-book' in sys.argv:
+        count = build_book()
+        print(f"Solved {count} positions and wrote {BOOK_PATH}")
+        sys.exit(0)
+    
+    size, k, time_budget_ms = parse_board_flags(sys.argv)
+    play_game(size, k, time_budget_ms)
     
     # Ask if player wants to play again
     while input("\nPlay again? (y/n): ").lower() == 'y':
-        play_game()
+        play_game(size, k, time_budget_ms)
     
     print("\nThanks for playing! Goodbye! 👋")
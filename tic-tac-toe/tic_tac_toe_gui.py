@@ -5,25 +5,66 @@ A graphical version with unbeatable AI using Minimax algorithm
 
 import tkinter as tk
 from tkinter import messagebox
+from concurrent.futures import ThreadPoolExecutor
+import queue
+import sys
+import threading
 import time
 
+import tic_tac_toe as engine
+from nxn_engine import NxNEngine
+
+
+# How often the Tk loop checks for a finished AI search (milliseconds)
+POLL_INTERVAL_MS = 20
+
 
 class TicTacToeGUI:
-    def __init__(self):
-        """Initialize the GUI game"""
+    def __init__(self, size=3, k=3, time_budget_ms=1000, ai_delay_ms=0):
+        """
+        Initialize the GUI game
+        The classic 3x3 game uses the perfect Minimax AI; any other size
+        uses the N x N engine with a time budget per move.
+        ai_delay_ms optionally waits before the AI starts thinking, so its
+        reply doesn't appear instantly.
+        """
+        self.size = size
+        self.k = k
+        self.classic = (size, k) == (3, 3)
+        self.nxn = None if self.classic else NxNEngine(size, k, time_budget_ms)
+        
         self.window = tk.Tk()
         self.window.title("Tic-Tac-Toe AI Game")
-        self.window.geometry("400x500")
+        if self.classic:
+            self.window.geometry("400x500")
         self.window.resizable(False, False)
         self.window.configure(bg='#2C3E50')
         
-        # Game state
-        self.board = [' ' for _ in range(9)]
+        # Game state - the GameState keeps the winner and empty-cell count
+        # up to date on every move; self.board is its list of cells
+        self.state = engine.GameState(size, k)
+        self.board = self.state.cells
         self.human = 'X'
         self.ai = 'O'
         self.current_player = self.human
         self.game_active = True
         
+        # The AI searches on a worker thread so the window never freezes.
+        # Results come back through a queue that the Tk loop polls with
+        # after(). Each search gets an id; results from a search that was
+        # cancelled (by starting a new game) are thrown away.
+        self.ai_delay_ms = ai_delay_ms
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.ai_results = queue.Queue()
+        self.search_id = 0
+        self.cancel_event = threading.Event()
+        self.pending_ai_call = None
+        self.window.protocol("WM_DELETE_WINDOW", self.close)
+        
+        # Load the solved table up front so the first AI move is a lookup
+        if self.classic:
+            engine.get_book()
+        
         # Create UI elements
         self.create_widgets()
         
@@ -42,7 +83,7 @@ class TicTacToeGUI:
         # Info label
         self.info_label = tk.Label(
             self.window, 
-            text="You are X | AI is O", 
+            text="You are X | AI is O" if self.classic else f"You are X | AI is O | {self.k} in a row", 
             font=('Arial', 11),
             bg='#2C3E50',
             fg='#BDC3C7'
@@ -63,16 +104,16 @@ class TicTacToeGUI:
         board_frame = tk.Frame(self.window, bg='#2C3E50')
         board_frame.pack(pady=10)
         
-        # Create 9 buttons for the board
+        # Create one button per board position
         self.buttons = []
-        for i in range(9):
-            row = i // 3
-            col = i % 3
+        for i in range(self.size * self.size):
+            row = i // self.size
+            col = i % self.size
             
             button = tk.Button(
                 board_frame,
                 text=' ',
-                font=('Arial', 28, 'bold'),
+                font=('Arial', 28 if self.size <= 3 else max(12, 84 // self.size), 'bold'),
                 width=4,
                 height=1,
                 bg='#34495E',
@@ -129,7 +170,7 @@ class TicTacToeGUI:
             return
         
         # Make the move
-        self.board[position] = self.human
+        self.state.make(position, self.human)
         self.buttons[position].config(text=self.human, fg='#3498DB', disabledforeground='#3498DB')
         self.buttons[position].config(state='disabled')
         
@@ -140,21 +181,66 @@ class TicTacToeGUI:
         # AI's turn
         self.current_player = self.ai
         self.status_label.config(text="AI is thinking...", fg='#E67E22')
-        self.window.update()
-        
-        # Small delay for better UX
-        self.window.after(500, self.ai_move)
+        self.pending_ai_call = self.window.after(self.ai_delay_ms, self.ai_move)
     
     def ai_move(self):
-        """Handle AI's move using Minimax algorithm"""
+        """Start the AI's search in the background"""
+        self.pending_ai_call = None
         if not self.game_active:
             return
         
-        # Get best move from AI
-        move = self.get_best_move()
+        self.search_id += 1
+        self.cancel_event = threading.Event()
+        self.executor.submit(self.search_in_background, list(self.board), self.search_id, self.cancel_event)
+        self.window.after(POLL_INTERVAL_MS, self.poll_ai_result, self.search_id)
+    
+    def search_in_background(self, board, search_id, cancel_event):
+        """Worker thread: find the AI's move and post it to the result queue"""
+        if cancel_event.is_set():
+            return
+        if self.nxn:
+            # Searches run one at a time on the single worker, so setting
+            # the stop check on the shared engine is safe
+            self.nxn.should_stop = cancel_event.is_set
+        try:
+            move = self.get_best_move(board)
+        except Exception as error:  # Report instead of leaving the UI waiting
+            move = error
+        self.ai_results.put((search_id, move))
+    
+    def poll_ai_result(self, search_id):
+        """Tk loop: apply the AI's move once its search has finished"""
+        if search_id != self.search_id:
+            return  # Search was cancelled, stop polling for it
+        
+        try:
+            result_id, move = self.ai_results.get_nowait()
+        except queue.Empty:
+            self.window.after(POLL_INTERVAL_MS, self.poll_ai_result, search_id)
+            return
+        
+        if result_id != search_id:
+            # Late result of a cancelled search; keep waiting for this one
+            self.window.after(POLL_INTERVAL_MS, self.poll_ai_result, search_id)
+            return
+        if isinstance(move, Exception):
+            self.handle_ai_error(move)
+            return
+        self.apply_ai_move(move)
+    
+    def handle_ai_error(self, error):
+        """Report a failed AI search and start over, so the board doesn't stay stuck on the AI's turn"""
+        self.status_label.config(text="⚠️ AI error", fg='#E74C3C')
+        messagebox.showerror("AI Error", f"The AI couldn't pick a move:\n{type(error).__name__}: {error}\n\nStarting a new game.")
+        self.reset_game()
+    
+    def apply_ai_move(self, move):
+        """Handle AI's move using Minimax algorithm"""
+        if not self.game_active:
+            return
         
         if move is not None:
-            self.board[move] = self.ai
+            self.state.make(move, self.ai)
             self.buttons[move].config(text=self.ai, fg='#E74C3C', disabledforeground='#E74C3C')
             self.buttons[move].config(state='disabled')
         
@@ -171,7 +257,7 @@ class TicTacToeGUI:
         if self.check_winner(self.human):
             self.game_active = False
             self.status_label.config(text="🎉 You Won! Amazing!", fg='#27AE60')
-            messagebox.showinfo("Game Over", "Congratulations! You won!\n(This should be impossible!)")
+            messagebox.showinfo("Game Over", "Congratulations! You won!" + ("\n(This should be impossible!)" if self.classic else ""))
             return True
         
         elif self.check_winner(self.ai):
@@ -190,80 +276,46 @@ class TicTacToeGUI:
     
     def check_winner(self, player):
         """Check if a player has won"""
-        win_patterns = [
-            [0, 1, 2], [3, 4, 5], [6, 7, 8],  # Rows
-            [0, 3, 6], [1, 4, 7], [2, 5, 8],  # Columns
-            [0, 4, 8], [2, 4, 6]               # Diagonals
-        ]
-        
-        for pattern in win_patterns:
-            if (self.board[pattern[0]] == player and 
-                self.board[pattern[1]] == player and 
-                self.board[pattern[2]] == player):
-                return True
-        return False
+        return self.state.winner == player
     
     def is_board_full(self):
         """Check if board is full"""
-        return ' ' not in self.board
+        return self.state.is_full()
     
     def get_available_moves(self):
         """Get list of available positions"""
-        return [i for i in range(9) if self.board[i] == ' ']
+        return self.state.available_moves()
     
     # ===== MINIMAX ALGORITHM =====
     
     def minimax(self, board, is_maximizing):
         """
-        Minimax algorithm - AI's brain
-        Simulates all possible moves to find the best one
+        Minimax algorithm - AI's brain (classic 3x3 board only)
+        Runs the shared bitboard search from tic_tac_toe.py
         """
-        # Check terminal states
-        if self.check_winner(self.ai):
-            return 1
-        if self.check_winner(self.human):
-            return -1
-        if ' ' not in board:
-            return 0
-        
-        if is_maximizing:
-            # AI's turn - maximize score
-            best_score = -float('inf')
-            for move in self.get_available_moves():
-                board[move] = self.ai
-                score = self.minimax(board, False)
-                board[move] = ' '
-                best_score = max(score, best_score)
-            return best_score
-        else:
-            # Human's turn - minimize score
-            best_score = float('inf')
-            for move in self.get_available_moves():
-                board[move] = self.human
-                score = self.minimax(board, True)
-                board[move] = ' '
-                best_score = min(score, best_score)
-            return best_score
+        return engine.minimax(board, is_maximizing)
     
-    def get_best_move(self):
-        """Find the best move for AI"""
-        best_score = -float('inf')
-        best_move = None
-        
-        for move in self.get_available_moves():
-            self.board[move] = self.ai
-            score = self.minimax(self.board, False)
-            self.board[move] = ' '
-            
-            if score > best_score:
-                best_score = score
-                best_move = move
-        
-        return best_move
+    def get_best_move(self, board=None):
+        """Find the best move for AI (on the current board by default)"""
+        if board is None:
+            board = self.board
+        if self.nxn:
+            return self.nxn.get_best_move(board)
+        return engine.get_best_move(board)
+    
+    def cancel_ai(self):
+        """Stop any AI search or scheduled AI move of the current game"""
+        if self.pending_ai_call is not None:
+            self.window.after_cancel(self.pending_ai_call)
+            self.pending_ai_call = None
+        self.cancel_event.set()
+        self.search_id += 1
     
     def reset_game(self):
         """Reset the game to initial state"""
-        self.board = [' ' for _ in range(9)]
+        self.cancel_ai()
+        self.state = engine.GameState(self.size, self.k)
+        self.board = self.state.cells
         self.current_player = self.human
         self.game_active = True
         
@@ -277,7 +329,13 @@ class TicTacToeGUI:
         self.reset_game()
         self.current_player = self.ai
         self.status_label.config(text="AI is thinking...", fg='#E67E22')
-        self.window.after(500, self.ai_move)
+        self.pending_ai_call = self.window.after(self.ai_delay_ms, self.ai_move)
+    
+    def close(self):
+        """Stop the AI worker and close the window"""
+        self.cancel_ai()
+        self.executor.shutdown(wait=False)
+        self.window.destroy()
     
     def run(self):
         """Start the GUI application"""
@@ -286,5 +344,10 @@ class TicTacToeGUI:
 
 # Run the game
 if __name__ == "__main__":
-    game = TicTacToeGUI()
+    size, k, time_budget_ms = engine.parse_board_flags(sys.argv)
+    
+    # --delay MS: optional pause before the AI replies (default none)
+    ai_delay_ms = int(sys.argv[sys.argv.index('--delay') + 1]) if '--delay' in sys.argv else 0
+    
+    game = TicTacToeGUI(size, k, time_budget_ms, ai_delay_ms)
     game.run()